@@ -0,0 +1,362 @@
+"""Offline throughput benchmark for the programmatic SEO pipeline.
+
+Runs ``ProgrammaticSEOGenerator`` end to end against ``FakeGenAIClient``, a
+deterministic local stand-in for ``genai.Client``, inside a throwaway
+directory, so no API calls are made and nothing in the repo is touched.
+
+Example:
+    python scripts/bench_programmatic_seo.py --pages 10 1000 10000 --latency-ms 400 --concurrency 32
+
+``--postprocess N`` instead times the per-page HTML post-processing (plain
+text, read time, excerpt, FAQ items, quality gate) on N synthetic pages.
+"""
+
+import argparse
+import contextlib
+import csv
+import hashlib
+import importlib
+import io
+import json
+import math
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from programmatic_seo import (  # noqa: E402
+    GENERIC_PHRASES,
+    LocalBatchBackend,
+    PageText,
+    ProgrammaticSEOGenerator,
+    extract_faq_items,
+)
+
+SECTION_KEYS = (
+    "intro_content",
+    "benefits_content",
+    "workflow_content",
+    "steps_content",
+    "results_content",
+    "faq_content",
+)
+
+CONTEXT_RE = re.compile(r"automating (.+?) for (.+?) using (.+?)[.\n]", re.I)
+GROUP_ITEM_RE = re.compile(r"^\s+\d+\. (.+)$", re.M)
+
+
+class FakeAPIError(Exception):
+    """Mimics google.genai.errors.APIError closely enough for ModelClient."""
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.details = {"error": {"code": code, "message": message}}
+
+
+class _FakeModels:
+    def __init__(self, owner: "FakeGenAIClient") -> None:
+        self._owner = owner
+
+    def generate_content(self, model: str, contents: str, config: Any = None) -> Any:
+        return self._owner.respond(contents, config)
+
+
+class FakeGenAIClient:
+    """Local stand-in for ``genai.Client`` with configurable latency and failures.
+
+    Outcomes are derived from a hash of the seed, the prompt and how many times
+    that prompt has been seen, so a run is reproducible regardless of thread
+    scheduling, while retries of a failed prompt can still succeed.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 200.0,
+        jitter_ms: float = 50.0,
+        error_rate: float = 0.0,
+        rate_429: float = 0.0,
+        response_words: int = 120,
+        seed: int = 0,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.response_words = response_words
+        self.seed = seed
+        self.models = _FakeModels(self)
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _rng(self, contents: str) -> random.Random:
+        with self._lock:
+            self.calls += 1
+            count = self._seen.get(contents, 0)
+            self._seen[contents] = count + 1
+        digest = hashlib.sha256(f"{self.seed}:{count}:{contents}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def _paragraph(self, rng: random.Random, industry: str, words: int) -> str:
+        vocab = ("workflow", "pipeline", "intake", "handoff", "report", "sync", "alert", "audit", "team", "records")
+        body = " ".join(rng.choice(vocab) for _ in range(words))
+        return f"<p>For {industry}, {body}. {industry} teams see results.</p>"
+
+    def _page(self, rng: random.Random, industry: str) -> Dict[str, str]:
+        per_section = max(1, self.response_words // len(SECTION_KEYS))
+        body = {key: self._paragraph(rng, industry, per_section) for key in SECTION_KEYS}
+        body["faq_content"] = "".join(
+            f"<h4>Question {i} for {industry}?</h4>{self._paragraph(rng, industry, per_section // 3 + 1)}"
+            for i in range(3)
+        )
+        return body
+
+    def respond(self, contents: str, config: Any) -> Any:
+        rng = self._rng(contents)
+        latency = max(0.0, rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        time.sleep(latency)
+
+        roll = rng.random()
+        if roll < self.rate_429:
+            with self._lock:
+                self.throttled += 1
+            raise FakeAPIError(429, "RESOURCE_EXHAUSTED")
+        if roll < self.rate_429 + self.error_rate:
+            with self._lock:
+                self.errors += 1
+            raise FakeAPIError(503, "UNAVAILABLE")
+
+        match = CONTEXT_RE.search(contents)
+        industry = match.group(2) if match else "your industry"
+        if getattr(config, "response_mime_type", "") == "application/json":
+            industries = GROUP_ITEM_RE.findall(contents)
+            if industries:
+                text = json.dumps([{"industry": name, **self._page(rng, name)} for name in industries])
+            else:
+                text = json.dumps(self._page(rng, industry))
+        else:
+            text = self._paragraph(rng, industry, self.response_words)
+
+        prompt_tokens = len(contents) // 4
+        output_tokens = len(text) // 4
+        usage = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+def write_catalog(data_root: Path, pages: int) -> None:
+    """Write synthetic tools/use_cases/industries CSVs whose product covers ``pages``."""
+    side = max(1, math.ceil(pages ** (1 / 3)))
+    data_root.mkdir(parents=True, exist_ok=True)
+    for filename, prefix in (("tools.csv", "Tool"), ("use_cases.csv", "use case"), ("industries.csv", "industry")):
+        with (data_root / filename).open("w", newline="", encoding="utf-8") as handle:
+            writer = csv.DictWriter(handle, fieldnames=["name", "category", "description"])
+            writer.writeheader()
+            for i in range(side):
+                writer.writerow({"name": f"{prefix} {i}", "category": f"group {i % 4}", "description": f"{prefix} {i}"})
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def warm_imports() -> None:
+    """Import the modules the generator loads lazily, so the first timed run doesn't pay for them."""
+    for module in ("google.genai.types", "jinja2", "slugify"):
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+
+def run_benchmark(pages: int, args: argparse.Namespace, template: Optional[Path]) -> Dict[str, Any]:
+    workdir = Path(tempfile.mkdtemp(prefix="seo-bench-"))
+    try:
+        data_root = workdir / "data" / "programmatic-seo"
+        write_catalog(data_root, pages)
+        if template is not None:
+            (data_root / "templates").mkdir(parents=True, exist_ok=True)
+            shutil.copy(template, data_root / "templates" / "page_template.html")
+
+        client = FakeGenAIClient(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            rate_429=args.rate_429,
+            response_words=args.response_words,
+            seed=args.seed,
+        )
+        generator = ProgrammaticSEOGenerator(api_key="offline-benchmark", client=client, root_dir=workdir)
+        generator.ai_sectioned = args.sectioned
+        generator.group_size = args.group_size
+        # Batch mode hands results to the page path through the (throwaway) response cache
+        generator.cache.directory = workdir / ".cache" / "responses"
+        generator.cache.enabled = args.batch
+        if args.batch:
+            generator.batch_backend = LocalBatchBackend(client, workdir / "batch-jobs", concurrency=args.concurrency)
+            generator.batch_dir = workdir / "batch"
+        generator.incremental = False
+        if args.render_workers is not None:
+            generator.render_workers = args.render_workers
+        if generator.model_client is not None:
+            generator.model_client.base_delay = args.backoff_seconds
+            generator.model_client.max_delay = args.backoff_seconds * 8
+
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        start = time.perf_counter()
+        with output:
+            if args.batch:
+                generator.generate_batch(limit=pages, concurrency=args.concurrency)
+            else:
+                generator.generate_all_pages(limit=pages, concurrency=args.concurrency)
+        elapsed = time.perf_counter() - start
+
+        timings = generator.timings
+        page_times = timings.get("page", [])
+        built = len(page_times)
+        report = generator.run_report or {}
+        return {
+            "pages": built,
+            "seconds": round(elapsed, 3),
+            "pages_per_sec": round(built / elapsed, 2) if elapsed else 0.0,
+            "p50_page_ms": round(percentile(page_times, 50) * 1000, 1),
+            "p95_page_ms": round(percentile(page_times, 95) * 1000, 1),
+            "api_calls_per_page": round(client.calls / built, 2) if built else 0.0,
+            "injected_429": client.throttled,
+            "injected_errors": client.errors,
+            "retries": report.get("model", {}).get("retries", 0),
+            "fallback_rate": report.get("pages", {}).get("fallbackRate", 0.0),
+            "tokens": report.get("tokens", {}),
+            "stage_seconds": {
+                stage: round(sum(values), 3)
+                for stage, values in sorted(timings.items())
+                if stage not in {"page", "model"}
+            },
+            "model_seconds": round(sum(timings.get("model", [])), 3),
+        }
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _multi_pass(content: Dict[str, str], industry: str) -> Dict[str, Any]:
+    """The per-page post-processing as it was before PageText: one strip or scan per use."""
+    strip = ProgrammaticSEOGenerator.strip_html
+    faq_items = [
+        {"q": strip(q).strip(), "a": strip(a).strip()}
+        for q, a in re.findall(r"<h4[^>]*>(.*?)</h4>\s*<p[^>]*>(.*?)</p>", content["faq_content"], flags=re.S | re.I)
+    ]
+    read_time = ProgrammaticSEOGenerator.estimate_read_time(content.values())
+    intro = strip(content["intro_content"])
+    excerpt = intro.split(". ")[0].strip()
+    combined = " ".join(content.values())
+    generic = sum(1 for phrase in GENERIC_PHRASES if re.search(phrase, combined, re.IGNORECASE))
+    too_generic = generic >= 3 or combined.lower().count(industry.lower()) < 3
+    text = " ".join(strip(value) for value in content.values())
+    return {"faq": faq_items, "read": read_time, "excerpt": excerpt, "generic": too_generic, "text": text}
+
+
+def _single_pass(content: Dict[str, str], industry: str) -> Dict[str, Any]:
+    page_text = PageText(content, industry)
+    return {
+        "faq": page_text.faq_items,
+        "read": page_text.read_time,
+        "excerpt": page_text.excerpt,
+        "generic": page_text.too_generic(),
+        "text": page_text.text,
+    }
+
+
+def bench_postprocess(pages: int, args: argparse.Namespace) -> Dict[str, float]:
+    """Per-page microseconds of each post-processing path over ``pages`` synthetic pages."""
+    client = FakeGenAIClient(response_words=args.response_words, seed=args.seed)
+    rng = random.Random(args.seed)
+    corpus = [(client._page(rng, f"industry {i}"), f"industry {i}") for i in range(pages)]
+    paths = {
+        "multi_pass_us": _multi_pass,
+        "single_pass_us": _single_pass,
+        "render_only_faq_us": lambda content, _industry: extract_faq_items(content["faq_content"]),
+    }
+    results: Dict[str, float] = {"pages": pages}
+    for name, path in paths.items():
+        start = time.perf_counter()
+        for content, industry in corpus:
+            path(content, industry)
+        results[name] = round((time.perf_counter() - start) / pages * 1e6, 2)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the programmatic SEO pipeline offline.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000], help="catalog sizes to run")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sectioned", action="store_true", help="benchmark AI_SECTIONED mode")
+    parser.add_argument("--batch", action="store_true", help="benchmark batch mode with LocalBatchBackend")
+    parser.add_argument("--group-size", type=int, default=1, help="industries per model call (GROUP_SIZE)")
+    parser.add_argument("--render-workers", type=int, help="render processes (default: RENDER_WORKERS env)")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls failing with 503")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of calls failing with 429")
+    parser.add_argument("--response-words", type=int, default=120)
+    parser.add_argument("--backoff-seconds", type=float, default=0.05, help="base backoff for injected failures")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-template", action="store_true", help="skip HTML rendering")
+    parser.add_argument("--postprocess", type=int, metavar="N", help="time HTML post-processing on N pages instead")
+    parser.add_argument("--json", dest="json_out", type=Path, help="also write results to this JSON file")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary build directories")
+    parser.add_argument("--verbose", action="store_true", help="show the generator's own output")
+    args = parser.parse_args(argv)
+    warm_imports()
+
+    if args.postprocess:
+        row = bench_postprocess(args.postprocess, args)
+        print(f"{'pages':>8} {'multi us/pg':>12} {'single us/pg':>13} {'faq us/pg':>10}")
+        print(
+            f"{row['pages']:>8} {row['multi_pass_us']:>12} {row['single_pass_us']:>13} {row['render_only_faq_us']:>10}"
+        )
+        if args.json_out:
+            args.json_out.write_text(json.dumps(row, indent=2), encoding="utf-8")
+        return
+
+    template = None
+    if not args.no_template:
+        template = Path(__file__).resolve().parents[1] / "data" / "programmatic-seo" / "templates" / "page_template.html"
+
+    results = [run_benchmark(pages, args, template) for pages in args.pages]
+
+    print()
+    print(f"{'pages':>8} {'sec':>9} {'pages/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'calls/pg':>9}")
+    for row in results:
+        print(
+            f"{row['pages']:>8} {row['seconds']:>9} {row['pages_per_sec']:>9} "
+            f"{row['p50_page_ms']:>9} {row['p95_page_ms']:>9} {row['api_calls_per_page']:>9}"
+        )
+    for row in results:
+        stages = ", ".join(f"{stage} {seconds}s" for stage, seconds in row["stage_seconds"].items())
+        print(f"{row['pages']:>8} pages: model {row['model_seconds']}s (summed across threads); {stages}")
+
+    if args.json_out:
+        args.json_out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
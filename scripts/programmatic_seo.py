@@ -1,42 +1,1744 @@
+from __future__ import annotations
+
+import argparse
 import csv
+import gzip
+import hashlib
+import heapq
 import json
 import os
+import queue
+import random
 import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from datetime import datetime
+from html import escape as html_escape
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar
+
+# google-genai, Jinja and python-slugify are imported on first use (see _genai,
+# load_template and page_slug) so render, manifest and sitemap runs start fast
+# and don't need the SDK installed.
+if TYPE_CHECKING:
+    from google import genai as genai_module
+    from jinja2 import Environment, Template
+
+# Sitemap protocol limits: 50,000 URLs and 50 MB (uncompressed) per file
+SITEMAP_MAX_URLS = 50000
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+
+# Words left out of the manifest search index
+SEARCH_STOPWORDS = frozenset(
+    "a an and are as at be by for from how in into is it of on or our the their this to with your".split()
+)
+SEARCH_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Bump whenever prompt wording or the page payload shape changes so that
+# incremental builds regenerate every page.
+PROMPT_VERSION = "1"
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def xml_escape(text: str) -> str:
+    """Escape &, < and > for XML text (xml.sax.saxutils drags in urllib/http)."""
+    return html_escape(text, quote=False)
+
+
+def _genai() -> "genai_module":
+    from google import genai
+
+    return genai
+
+
+def run_bounded(func: Callable[[T], R], items: Iterable[T], limit: int) -> Iterator[R]:
+    """Run ``func`` over ``items`` on a thread pool, keeping at most ``limit`` calls in flight.
+
+    Items are pulled lazily, so the iterable is never materialised. Results are
+    yielded in completion order.
+    """
+    limit = max(1, limit)
+    if limit == 1:
+        for item in items:
+            yield func(item)
+        return
+
+    iterator = iter(items)
+    with ThreadPoolExecutor(max_workers=limit) as pool:
+        pending: Set[Future] = set()
+        for item in iterator:
+            pending.add(pool.submit(func, item))
+            if len(pending) >= limit:
+                break
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                next_item = next(iterator, None)
+                if next_item is not None:
+                    pending.add(pool.submit(func, next_item))
+                yield future.result()
+
+
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).strip().lower() in {"1", "true", "yes", "y", "on"}
+
+
+class ResponseCache:
+    """Content-addressed on-disk cache of model responses.
+
+    Entries are keyed by a SHA-256 of the full request (model, prompt and
+    generation config) and stored as one small JSON file each. Entries expire
+    ``max_age_seconds`` after they were written, however often they are read;
+    reads only refresh the file's mtime so ``prune`` can evict the least
+    recently used entries first.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, max_age_seconds: float, enabled: bool = True) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _jsonable(value: Any) -> Any:
+        if hasattr(value, "model_dump"):
+            return value.model_dump(mode="json", exclude_none=True)
+        if isinstance(value, dict):
+            return {k: ResponseCache._jsonable(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [ResponseCache._jsonable(v) for v in value]
+        return value
+
+    def key(self, model: str, contents: str, config: Dict[str, Any]) -> str:
+        request = {"model": model, "contents": contents, "config": self._jsonable(config)}
+        blob = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _expired(self, entry: Dict[str, Any], mtime: float, now: float) -> bool:
+        # Entries written before ``created`` was recorded fall back to their mtime
+        created = entry.get("created")
+        return now - (created if isinstance(created, (int, float)) else mtime) > self.max_age_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            if self._expired(entry, path.stat().st_mtime, time.time()):
+                self.misses += 1
+                return None
+            os.utime(path)
+        except (OSError, ValueError, AttributeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.get("text")
+
+    def set(self, key: str, text: str) -> None:
+        if not self.enabled or not text:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump({"text": text, "created": time.time()}, handle, ensure_ascii=False)
+        os.replace(tmp_name, path)
+
+    def prune(self) -> int:
+        """Drop expired entries, then the least recently used until under ``max_bytes``."""
+        if not self.directory.exists():
+            return 0
+        now = time.time()
+        entries = []
+        removed = 0
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+                entry = json.loads(path.read_text(encoding="utf-8"))
+                expired = not isinstance(entry, dict) or self._expired(entry, stat.st_mtime, now)
+            except OSError:
+                continue
+            except ValueError:
+                expired = True
+            if expired:
+                path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+
+class FatalModelError(RuntimeError):
+    """A model call failed in a way that retrying will not fix (or retries are exhausted)."""
+
+
+class RateLimiter:
+    """Token-bucket limiter for requests-per-minute and tokens-per-minute quotas.
+
+    A limit of 0 disables that bucket. Buckets refill continuously and start
+    full, so short bursts up to the per-minute quota are allowed.
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def acquire(self, tokens: int = 0) -> None:
+        # A single request larger than the whole TPM quota would otherwise never fit
+        tokens = min(tokens, int(self.tpm)) if self.tpm else 0
+        while True:
+            with self._lock:
+                self._refill()
+                wait_for = 0.0
+                if self.rpm and self._requests < 1:
+                    wait_for = max(wait_for, (1 - self._requests) * 60 / self.rpm)
+                if self.tpm and self._tokens < tokens:
+                    wait_for = max(wait_for, (tokens - self._tokens) * 60 / self.tpm)
+                if wait_for <= 0:
+                    if self.rpm:
+                        self._requests -= 1
+                    if self.tpm:
+                        self._tokens -= tokens
+                    return
+            time.sleep(wait_for)
+
+    def adjust(self, tokens: int) -> None:
+        """Correct the token bucket once the real usage of a request is known."""
+        if not self.tpm or not tokens:
+            return
+        with self._lock:
+            self._tokens = min(self.tpm, self._tokens - tokens)
+
+
+class TokenBudget:
+    """Per-run cap on model spend in tokens and/or USD (a limit of 0 disables it).
+
+    ``charge`` records each reply's actual usage against the unit of work (page
+    slug or group key) that made it. Before a page or group starts, ``admit``
+    checks that spend so far, the expected remaining cost of the work in flight
+    and the new work together fit the budget. The expected cost per page is the
+    mean actual cost of the settled pages that spent tokens (cache hits and
+    pages that failed before calling the model are left out of the mean), or
+    ``page_estimate`` until one has. While work is in flight an ``admit`` that
+    doesn't fit waits for it to settle; with nothing left in flight it refuses,
+    and every later ``admit`` is refused too so the run drains instead of
+    starting more work.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 0,
+        max_usd: float = 0.0,
+        price_input_per_mtok: float = 0.0,
+        price_output_per_mtok: float = 0.0,
+        page_estimate: Tuple[float, float] = (0.0, 0.0),
+    ) -> None:
+        self.max_tokens = max_tokens
+        self.max_usd = max_usd
+        self.price_input_per_mtok = price_input_per_mtok
+        self.price_output_per_mtok = price_output_per_mtok
+        self.page_estimate = page_estimate
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.pages = 0
+        self.in_flight = 0
+        self.refused = False
+        # Usage of settled pages and how many of them spent any, and usage so far of units still in flight
+        self._settled = [0, 0]
+        self._spending_pages = 0
+        self._open: Dict[str, List[int]] = {}
+        self._condition = threading.Condition()
+
+    def cost(self, prompt: float, output: float) -> float:
+        return prompt / 1e6 * self.price_input_per_mtok + output / 1e6 * self.price_output_per_mtok
+
+    def _fits(self, prompt: float, output: float) -> bool:
+        if self.max_tokens and prompt + output > self.max_tokens:
+            return False
+        return not (self.max_usd and self.cost(prompt, output) > self.max_usd)
+
+    def _per_page(self) -> Tuple[float, float]:
+        if self._spending_pages:
+            return self._settled[0] / self._spending_pages, self._settled[1] / self._spending_pages
+        return self.page_estimate
+
+    def _committed(self, pages: int) -> Tuple[float, float]:
+        """Spend so far plus the expected remaining cost of the work in flight and ``pages`` more."""
+        per_prompt, per_output = self._per_page()
+        open_prompt = sum(usage[0] for usage in self._open.values())
+        open_output = sum(usage[1] for usage in self._open.values())
+        return (
+            self.prompt_tokens + max(0.0, self.in_flight * per_prompt - open_prompt) + pages * per_prompt,
+            self.output_tokens + max(0.0, self.in_flight * per_output - open_output) + pages * per_output,
+        )
+
+    @property
+    def exhausted(self) -> bool:
+        with self._condition:
+            return self.refused or not self._fits(self.prompt_tokens, self.output_tokens)
+
+    def charge(self, unit: Optional[str], prompt: int, output: int) -> None:
+        with self._condition:
+            self.prompt_tokens += prompt
+            self.output_tokens += output
+            if unit is not None:
+                usage = self._open.setdefault(unit, [0, 0])
+                usage[0] += prompt
+                usage[1] += output
+
+    def admit(self, pages: int = 1) -> bool:
+        with self._condition:
+            while not self.refused:
+                if self._fits(*self._committed(pages)):
+                    self.in_flight += pages
+                    return True
+                if not self.in_flight or not self._fits(self.prompt_tokens, self.output_tokens):
+                    self.refused = True
+                else:
+                    self._condition.wait()
+            return False
+
+    def settle(self, units: Iterable[str], pages: int = 1) -> None:
+        with self._condition:
+            spent = 0
+            for unit in units:
+                prompt, output = self._open.pop(unit, (0, 0))
+                self._settled[0] += prompt
+                self._settled[1] += output
+                spent += prompt + output
+            if spent:
+                self._spending_pages += pages
+            self.in_flight -= pages
+            self.pages += pages
+            self._condition.notify_all()
+
+    def affordable_pages(self) -> int:
+        """How many more pages the remaining budget covers at the expected cost per page."""
+        with self._condition:
+            per_prompt, per_output = self._per_page()
+            limits = []
+            if self.max_tokens:
+                remaining = self.max_tokens - self.prompt_tokens - self.output_tokens
+                limits.append(remaining / max(per_prompt + per_output, 1))
+            if self.max_usd:
+                spent = self.cost(self.prompt_tokens, self.output_tokens)
+                limits.append((self.max_usd - spent) / max(self.cost(per_prompt, per_output), 1e-9))
+            return max(0, int(min(limits))) if limits else sys.maxsize
+
+    def summary(self) -> Dict[str, Any]:
+        with self._condition:
+            per_prompt, per_output = self._per_page()
+            return {
+                "maxTokens": self.max_tokens,
+                "maxUsd": self.max_usd,
+                "spentTokens": self.prompt_tokens + self.output_tokens,
+                "spentUsd": round(self.cost(self.prompt_tokens, self.output_tokens), 4),
+                "pages": self.pages,
+                "tokensPerPage": round(per_prompt + per_output),
+                "exhausted": self.refused,
+            }
+
+
+class ModelClient:
+    """Shared wrapper around ``genai.Client`` used by every generation path.
+
+    Adds RPM/TPM rate limiting, exponential backoff with full jitter, retryable
+    vs fatal error classification, and AIMD concurrency control: the number of
+    calls in flight halves on every 429 and grows back by one after a run of
+    successes.
+    """
+
+    RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        client: Any,
+        rpm: float = 0,
+        tpm: float = 0,
+        max_concurrency: int = 16,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ) -> None:
+        self.client = client
+        self.limiter = RateLimiter(rpm, tpm)
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency = self.max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._in_flight = 0
+        self._successes = 0
+        self._slots = threading.Condition()
+        # Optional ``on_event(name, **fields)`` hook for retry instrumentation
+        self.on_event: Optional[Callable[..., None]] = None
+
+    @staticmethod
+    def status_code(exc: BaseException) -> Optional[int]:
+        for attr in ("code", "status_code"):
+            value = getattr(exc, attr, None)
+            if isinstance(value, int):
+                return value
+        return None
+
+    @classmethod
+    def is_retryable(cls, exc: BaseException) -> bool:
+        code = cls.status_code(exc)
+        if code is not None:
+            return code in cls.RETRYABLE_STATUS
+        # Transport-level failures (httpx/requests/socket) carry no status code
+        if isinstance(exc, (ConnectionError, TimeoutError)):
+            return True
+        return any(name in type(exc).__name__ for name in ("Timeout", "Connect", "Network", "Transport", "Protocol"))
+
+    @staticmethod
+    def retry_after(exc: BaseException) -> Optional[float]:
+        """Server-suggested delay from a google.rpc RetryInfo detail, if present."""
+        payload = getattr(exc, "details", None)
+        error = payload.get("error", payload) if isinstance(payload, dict) else {}
+        details = error.get("details", []) if isinstance(error, dict) else []
+        for detail in details:
+            delay = str(detail.get("retryDelay", "")) if isinstance(detail, dict) else ""
+            if delay.endswith("s"):
+                try:
+                    return float(delay[:-1])
+                except ValueError:
+                    continue
+        return None
+
+    def _acquire_slot(self) -> None:
+        with self._slots:
+            while self._in_flight >= self.concurrency:
+                self._slots.wait()
+            self._in_flight += 1
+
+    def _release_slot(self, throttled: bool) -> None:
+        with self._slots:
+            self._in_flight -= 1
+            if throttled:
+                self.concurrency = max(1, self.concurrency // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self.concurrency < self.max_concurrency and self._successes >= self.concurrency:
+                    self.concurrency += 1
+                    self._successes = 0
+            self._slots.notify_all()
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def generate(self, model: str, contents: str, config: Any) -> Any:
+        estimate = len(contents) // 4 + int(getattr(config, "max_output_tokens", 0) or 0)
+        for attempt in range(self.max_retries + 1):
+            self._acquire_slot()
+            throttled = False
+            try:
+                self.limiter.acquire(estimate)
+                response = self.client.models.generate_content(model=model, contents=contents, config=config)
+                usage = getattr(response, "usage_metadata", None)
+                total = getattr(usage, "total_token_count", None)
+                if isinstance(total, int):
+                    self.limiter.adjust(total - estimate)
+                return response
+            except Exception as exc:
+                code = self.status_code(exc)
+                throttled = code == 429
+                if not self.is_retryable(exc):
+                    raise FatalModelError(f"{type(exc).__name__}: {exc}") from exc
+                if attempt >= self.max_retries:
+                    raise FatalModelError(f"Retries exhausted: {type(exc).__name__}: {exc}") from exc
+                delay = self.retry_after(exc) if throttled else None
+                last_delay = delay if delay is not None else self.backoff(attempt)
+                if self.on_event is not None:
+                    self.on_event(
+                        "model_retry",
+                        status=code,
+                        error=type(exc).__name__,
+                        attempt=attempt + 1,
+                        delay=round(last_delay, 3),
+                    )
+            finally:
+                self._release_slot(throttled)
+            time.sleep(last_delay)
+        raise FatalModelError("Retries exhausted")
+
+
+# Output ceiling for a grouped multi-page call (Gemini 2.5 models allow 65,536)
+GROUP_MAX_OUTPUT_TOKENS = 65536
+
+BATCH_SUCCEEDED = "JOB_STATE_SUCCEEDED"
+BATCH_TERMINAL_STATES = {BATCH_SUCCEEDED, "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+
+def batch_request_line(key: str, contents: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """One line of a Batch API input file; ``key`` comes back on the matching result."""
+    return {
+        "key": key,
+        "request": {
+            "contents": [{"role": "user", "parts": [{"text": contents}]}],
+            "generation_config": ResponseCache._jsonable(config),
+        },
+    }
 
-from google import genai
-from jinja2 import Template
-from slugify import slugify
+
+def batch_result_text(result: Dict[str, Any]) -> str:
+    """Concatenated text parts of a batch result's first candidate ("" on error)."""
+    candidates = (result.get("response") or {}).get("candidates") or []
+    if not candidates:
+        return ""
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    return "".join(part.get("text", "") for part in parts if isinstance(part, dict))
+
+
+class GenAIBatchBackend:
+    """Batch submission through the Gemini Batch API (``client.files`` / ``client.batches``).
+
+    Every backend implements ``submit(model, requests_path, display_name) -> job``,
+    ``poll(job) -> state`` and ``results(job) -> iterator of result dicts``, where
+    a result is ``{"key", "response"}`` or ``{"key", "error"}`` in REST JSON form.
+    """
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+
+    def submit(self, model: str, requests_path: Path, display_name: str) -> str:
+        uploaded = self.client.files.upload(
+            file=str(requests_path), config={"display_name": display_name, "mime_type": "jsonl"}
+        )
+        job = self.client.batches.create(model=model, src=uploaded.name, config={"display_name": display_name})
+        return job.name
+
+    def poll(self, job: str) -> str:
+        state = self.client.batches.get(name=job).state
+        return getattr(state, "name", str(state))
+
+    def results(self, job: str) -> Iterator[Dict[str, Any]]:
+        batch = self.client.batches.get(name=job)
+        data = self.client.files.download(file=batch.dest.file_name)
+        for line in data.decode("utf-8").splitlines():
+            if line.strip():
+                yield json.loads(line)
+
+
+class LocalBatchBackend:
+    """Local stand-in for the Batch API that answers requests with ``client.models``.
+
+    Jobs live under ``directory``; the first ``poll`` runs every request (up to
+    ``concurrency`` at a time, no retries, so failures surface as per-item
+    errors like a real batch) and writes results in the Batch API's format.
+    """
+
+    def __init__(self, client: Any, directory: Path, concurrency: int = 8) -> None:
+        self.client = client
+        self.directory = directory
+        self.concurrency = concurrency
+
+    def _job_dir(self, job: str) -> Path:
+        return self.directory / job
+
+    def _state(self, job: str) -> Dict[str, Any]:
+        return json.loads((self._job_dir(job) / "job.json").read_text(encoding="utf-8"))
+
+    def submit(self, model: str, requests_path: Path, display_name: str) -> str:
+        job = f"{display_name}-{os.getpid()}-{int(time.time() * 1000)}"
+        job_dir = self._job_dir(job)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        state = {"model": model, "requests": str(requests_path), "state": "JOB_STATE_PENDING"}
+        atomic_write_text(job_dir / "job.json", json.dumps(state))
+        return job
+
+    def _answer(self, model: str, line: str) -> Dict[str, Any]:
+        item = json.loads(line)
+        request = item["request"]
+        contents = "".join(part.get("text", "") for part in request["contents"][0]["parts"])
+        try:
+            response = self.client.models.generate_content(
+                model=model,
+                contents=contents,
+                config=_genai().types.GenerateContentConfig(**request.get("generation_config", {})),
+            )
+        except Exception as exc:
+            code = ModelClient.status_code(exc)
+            return {"key": item["key"], "error": {"code": code, "message": str(exc)}}
+        usage = getattr(response, "usage_metadata", None)
+        return {
+            "key": item["key"],
+            "response": {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": getattr(response, "text", "") or ""}]}}],
+                "usageMetadata": {
+                    "promptTokenCount": getattr(usage, "prompt_token_count", None) or 0,
+                    "candidatesTokenCount": getattr(usage, "candidates_token_count", None) or 0,
+                    "totalTokenCount": getattr(usage, "total_token_count", None) or 0,
+                },
+            },
+        }
+
+    def poll(self, job: str) -> str:
+        state = self._state(job)
+        if state["state"] == "JOB_STATE_PENDING":
+            job_dir = self._job_dir(job)
+            with Path(state["requests"]).open(encoding="utf-8") as requests, (job_dir / "results.jsonl").open(
+                "w", encoding="utf-8"
+            ) as results:
+                lines = (line for line in requests if line.strip())
+                for result in run_bounded(lambda line: self._answer(state["model"], line), lines, self.concurrency):
+                    results.write(json.dumps(result, ensure_ascii=False) + "\n")
+            state["state"] = BATCH_SUCCEEDED
+            atomic_write_text(job_dir / "job.json", json.dumps(state))
+        return state["state"]
+
+    def results(self, job: str) -> Iterator[Dict[str, Any]]:
+        with (self._job_dir(job) / "results.jsonl").open(encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# Mersenne prime modulus for the MinHash permutations
+_MINHASH_PRIME = (1 << 61) - 1
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class NearDuplicateIndex:
+    """Catalog-wide near-duplicate detector using word shingles, MinHash and LSH banding.
+
+    Each page's plain text is reduced to a ``num_perm``-value MinHash signature
+    whose agreement rate estimates Jaccard similarity of word ``shingle_size``-grams.
+    Signatures are split into ``bands`` bands and hashed into buckets, so a lookup
+    only compares against pages sharing at least one band rather than the whole
+    catalog. Signatures persist as JSON lines so later runs only hash new pages.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _MINHASH_PRIME), rng.randrange(0, _MINHASH_PRIME)) for _ in range(num_perm)]
+        self.signatures: Dict[str, Tuple[int, ...]] = {}
+        self._buckets: List[Dict[Tuple[int, ...], Set[str]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    @property
+    def params(self) -> Dict[str, int]:
+        return {"num_perm": self.num_perm, "bands": self.bands, "shingle_size": self.shingle_size, "seed": self.seed}
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        tokens = _WORD_RE.findall(text.lower())
+        size = self.shingle_size
+        shingles = {" ".join(tokens[i:i + size]) for i in range(max(1, len(tokens) - size + 1))}
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+            for shingle in shingles
+        ]
+        prime = _MINHASH_PRIME
+        return tuple(min((a * h + b) % prime for h in hashes) for a, b in self._perms)
+
+    def _bands_of(self, signature: Tuple[int, ...]) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def similarity(self, a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        return sum(1 for x, y in zip(a, b) if x == y) / self.num_perm
+
+    def _query_locked(self, signature: Tuple[int, ...], exclude: Optional[str]) -> List[Tuple[str, float]]:
+        candidates: Set[str] = set()
+        for band, key in self._bands_of(signature):
+            candidates.update(self._buckets[band].get(key, ()))
+        candidates.discard(exclude)
+        matches = [(slug, self.similarity(signature, self.signatures[slug])) for slug in candidates]
+        return sorted((m for m in matches if m[1] >= self.threshold), key=lambda m: (-m[1], m[0]))
+
+    def _remove_locked(self, slug: str) -> None:
+        old = self.signatures.pop(slug, None)
+        if old is None:
+            return
+        for band, key in self._bands_of(old):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(slug)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def query(self, signature: Tuple[int, ...], exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Pages whose estimated similarity is at least ``threshold``, most similar first."""
+        with self._lock:
+            return self._query_locked(signature, exclude)
+
+    def add(self, slug: str, signature: Tuple[int, ...]) -> List[Tuple[str, float]]:
+        """Insert or replace a page and return its matches at insertion time."""
+        with self._lock:
+            self._remove_locked(slug)
+            matches = self._query_locked(signature, slug)
+            self.signatures[slug] = signature
+            for band, key in self._bands_of(signature):
+                self._buckets[band].setdefault(key, set()).add(slug)
+            return matches
+
+    def load(self, path: Path) -> "NearDuplicateIndex":
+        if not path.exists():
+            return self
+        with path.open(encoding="utf-8") as handle:
+            header = json.loads(handle.readline() or "{}")
+            if header.get("params") != self.params:
+                # Signatures from different parameters are not comparable
+                return self
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self.add(entry["slug"], tuple(entry["sig"]))
+        return self
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with self._lock, tmp_path.open("w", encoding="utf-8") as handle:
+            handle.write(json.dumps({"params": self.params}) + "\n")
+            for slug in sorted(self.signatures):
+                handle.write(json.dumps({"slug": slug, "sig": list(self.signatures[slug])}) + "\n")
+        os.replace(tmp_path, path)
+
+
+COMBO_KINDS = ("tool", "use_case", "industry")
+# Source CSV per combination kind, and the columns every row must have
+SOURCE_FILES = {"tool": "tools.csv", "use_case": "use_cases.csv", "industry": "industries.csv"}
+SOURCE_REQUIRED_COLUMNS = ("name",)
+
+
+class SourceDataError(ValueError):
+    """The source CSVs failed validation; ``errors`` lists every problem found."""
+
+    def __init__(self, errors: List[str]) -> None:
+        shown = errors[:20]
+        more = f"\n  ... and {len(errors) - len(shown)} more" if len(errors) > len(shown) else ""
+        super().__init__("Invalid source data:\n  " + "\n  ".join(shown) + more)
+        self.errors = errors
+
+
+class CombinationPlanner:
+    """Lazily enumerate tool x use case x industry combinations.
+
+    The cartesian product is never materialised: combinations are decoded from
+    an index (``nested`` and ``stratified`` orders) or expanded best-first from
+    a heap (``priority`` order), and filtered one at a time.
+
+    Orders:
+    - ``nested``: the original tool -> use case -> industry loop order.
+    - ``stratified``: tools rotate fastest and use cases/industries are shifted
+      per tool, so any prefix (e.g. ``limit=10``) spreads across every axis.
+    - ``priority``: descending product of per-row weights.
+
+    With ``group_size`` > 1 (grouped prompts) the ``stratified`` and
+    ``priority`` orders are planned at the (tool, use case) level over runs of
+    ``group_size`` consecutive industries, so each run fills one grouped call
+    however the plan is cut; ``nested`` order already keeps industries together.
+
+    With ``changed`` (kind -> row names) only combinations touching at least one
+    of those rows are produced, in nested order, without walking the rest of the
+    product.
+
+    Rules are declarative: a combination is dropped if it matches any ``block``
+    rule and, when ``allow`` rules exist, kept only if it matches one. A rule maps
+    ``"<kind>.<column>"`` (e.g. ``"industry.category"``) to a value or list of
+    values; all of a rule's conditions must match.
+    """
+
+    ORDERS = ("nested", "stratified", "priority")
+
+    def __init__(
+        self,
+        datasets: Dict[str, List[Dict[str, str]]],
+        order: str = "stratified",
+        rules: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        weights: Optional[Dict[Tuple[str, str], float]] = None,
+        changed: Optional[Dict[str, Set[str]]] = None,
+        group_size: int = 1,
+    ) -> None:
+        if order not in self.ORDERS:
+            raise ValueError(f"Unknown plan order {order!r}; expected one of {', '.join(self.ORDERS)}")
+        self.axes = [datasets["tools"], datasets["use_cases"], datasets["industries"]]
+        self.order = order
+        self.block = [self._compile_rule(rule) for rule in (rules or {}).get("block", [])]
+        self.allow = [self._compile_rule(rule) for rule in (rules or {}).get("allow", [])]
+        self.weights = weights or {}
+        # kind -> names of rows that changed; restricts the plan to combinations touching them
+        self.changed = changed
+        self.group_size = max(1, group_size)
+
+    @property
+    def total(self) -> int:
+        """Size of the unfiltered product."""
+        return len(self.axes[0]) * len(self.axes[1]) * len(self.axes[2])
+
+    @staticmethod
+    def _compile_rule(rule: Dict[str, Any]) -> List[Tuple[str, str, Set[str]]]:
+        conditions = []
+        for field, expected in rule.items():
+            kind, _, column = field.partition(".")
+            if kind not in COMBO_KINDS or not column:
+                raise ValueError(f"Invalid plan rule field {field!r}; use <tool|use_case|industry>.<column>")
+            values = expected if isinstance(expected, list) else [expected]
+            conditions.append((kind, column, {str(value) for value in values}))
+        return conditions
+
+    @staticmethod
+    def _matches(rule: List[Tuple[str, str, Set[str]]], combo: Dict[str, Dict[str, str]]) -> bool:
+        return all(combo[kind].get(column, "") in values for kind, column, values in rule)
+
+    def accepts(self, combo: Dict[str, Dict[str, str]]) -> bool:
+        if any(self._matches(rule, combo) for rule in self.block):
+            return False
+        return not self.allow or any(self._matches(rule, combo) for rule in self.allow)
+
+    def weight(self, kind: str, row: Dict[str, str]) -> float:
+        return self.weights.get((kind, row["name"]), 1.0)
+
+    def _combo(self, t: int, u: int, i: int) -> Dict[str, Dict[str, str]]:
+        return {"tool": self.axes[0][t], "use_case": self.axes[1][u], "industry": self.axes[2][i]}
+
+    def _changed_indices(self) -> Iterator[Tuple[int, int, int]]:
+        changed = self.changed or {}
+        marks = [
+            [row["name"] in changed.get(kind, ()) for row in axis] for axis, kind in zip(self.axes, COMBO_KINDS)
+        ]
+        for position in range(len(COMBO_KINDS)):
+            for j in (j for j, marked in enumerate(marks[position]) if marked):
+                ranges: List[Iterable[int]] = [range(len(axis)) for axis in self.axes]
+                ranges[position] = (j,)
+                for t in ranges[0]:
+                    for u in ranges[1]:
+                        for i in ranges[2]:
+                            indices = (t, u, i)
+                            # Emit each combination once: from the first changed axis it touches
+                            if not any(marks[earlier][indices[earlier]] for earlier in range(position)):
+                                yield indices
+
+    def _indices(self) -> Iterator[Tuple[int, int, int]]:
+        n_tools, n_uses, n_industries = (len(axis) for axis in self.axes)
+        if not (n_tools and n_uses and n_industries):
+            return
+        if self.changed is not None:
+            yield from self._changed_indices()
+        elif self.order == "nested":
+            for t in range(n_tools):
+                for u in range(n_uses):
+                    for i in range(n_industries):
+                        yield t, u, i
+        elif self.order == "stratified":
+            # Bijective: for each tool, rest -> (use case, industry run) is a shifted
+            # mixed-radix decode; each run is group_size consecutive industries
+            # (shifted per tool), so runs of 1 give the plain per-combination order
+            size = self.group_size
+            n_runs = -(-n_industries // size)
+            for k in range(n_tools * n_uses * n_runs):
+                t, rest = k % n_tools, k // n_tools
+                u, run = (rest % n_uses + t) % n_uses, rest // n_uses
+                for j in range(run * size, min((run + 1) * size, n_industries)):
+                    yield t, u, (j + t) % n_industries
+        else:
+            yield from self._priority_indices()
+
+    def _priority_indices(self) -> Iterator[Tuple[int, int, int]]:
+        # Sort each axis by weight and expand the product best-first. Each index
+        # triple has exactly one parent (decrement the first non-zero position), so
+        # no visited set is needed and the heap only holds the frontier.
+        ranked = [
+            [j for j in sorted(range(len(axis)), key=lambda j, a=axis, k=kind: -self.weight(k, a[j]))
+             if self.weight(kind, axis[j]) > 0]
+            for axis, kind in zip(self.axes, COMBO_KINDS)
+        ]
+        if not all(ranked):
+            return
+        weights = [[self.weight(kind, axis[j]) for j in order] for axis, kind, order in zip(self.axes, COMBO_KINDS, ranked)]
+        # The third heap axis is a run of group_size consecutive ranked industries,
+        # scored by its best (first) member
+        size = self.group_size
+        n_runs = -(-len(ranked[2]) // size)
+
+        def score(a: int, b: int, c: int) -> float:
+            return weights[0][a] * weights[1][b] * weights[2][c * size]
+
+        heap = [(-score(0, 0, 0), 0, 0, 0)]
+        while heap:
+            _, a, b, c = heapq.heappop(heap)
+            for industry in ranked[2][c * size:(c + 1) * size]:
+                yield ranked[0][a], ranked[1][b], industry
+            children = [(a + 1, b, c)]
+            if a == 0:
+                children.append((0, b + 1, c))
+                if b == 0:
+                    children.append((0, 0, c + 1))
+            for x, y, z in children:
+                if x < len(ranked[0]) and y < len(ranked[1]) and z < n_runs:
+                    heapq.heappush(heap, (-score(x, y, z), x, y, z))
+
+    def __iter__(self) -> Iterator[Dict[str, Dict[str, str]]]:
+        for t, u, i in self._indices():
+            combo = self._combo(t, u, i)
+            if self.accepts(combo):
+                yield combo
+
+
+def content_hash(value: Any) -> str:
+    """Stable SHA-256 of a string or JSON-serialisable value."""
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class BuildJournal:
+    """Append-only record of finished pages used for incremental and resumable builds.
+
+    Each line is one JSON entry keyed by slug; the most recent entry for a slug
+    wins. Entries are appended and flushed as soon as a page is written, so a
+    crash loses at most the pages that were still in flight. ``compact`` rewrites
+    the file with a single entry per slug.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._handle = None
+
+    def load(self) -> "BuildJournal":
+        self.entries = {}
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn final line from an interrupted run
+                        continue
+                    if isinstance(entry, dict) and entry.get("slug"):
+                        self.entries[entry["slug"]] = entry
+        return self
+
+    def is_current(self, slug: str, inputs: Dict[str, str], prompt_version: str) -> bool:
+        entry = self.entries.get(slug)
+        return (
+            bool(entry)
+            and not entry.get("fallback")
+            and entry.get("inputs") == inputs
+            and entry.get("prompt") == prompt_version
+        )
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, sort_keys=True, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._handle is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._handle = self.path.open("a", encoding="utf-8")
+            self._handle.write(line)
+            self._handle.flush()
+            self.entries[entry["slug"]] = entry
+
+    def compact(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            if not self.entries:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with tmp_path.open("w", encoding="utf-8") as handle:
+                for slug in sorted(self.entries):
+                    handle.write(json.dumps(self.entries[slug], sort_keys=True, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+
+
+class PagePack:
+    """Append-only JSONL pack of page payloads with a slug -> (offset, length) index.
+
+    Replaces one-file-per-slug storage for large catalogs: a page is one compact
+    JSON line in the pack and ``pages.pack.idx.json`` maps each slug to its byte
+    range, so readers (including server/routes/automation.ts) seek straight to a
+    page. The index's ``pack`` field names the data file it describes:
+    ``pages.pack.jsonl`` at first, then ``pages.pack.<generation>.jsonl`` after
+    each compaction. Rewritten pages are appended and the old bytes become
+    garbage until ``close`` compacts them into the next generation's file. The
+    index is only replaced after the data it points at is flushed, and a
+    superseded pack is only deleted after the new index is published, so an
+    interrupted run (or a concurrent reader) always sees a consistent pair.
+    """
+
+    def __init__(self, pack_path: Path, index_path: Path) -> None:
+        self.pack_path = pack_path
+        self.index_path = index_path
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        self.generation = 0
+        self._data_name = pack_path.name
+        self._size = 0
+        self._handle = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def data_path(self) -> Path:
+        """The pack file the current index describes."""
+        return self.pack_path.with_name(self._data_name)
+
+    def _generation_path(self, generation: int) -> Path:
+        return self.pack_path.with_name(f"{self.pack_path.stem}.{generation}{self.pack_path.suffix}")
+
+    def load(self) -> "PagePack":
+        with self._lock:
+            if self._loaded:
+                return self
+            self.offsets = {}
+            self._size = 0
+            self.generation = 0
+            self._data_name = self.pack_path.name
+            if self.index_path.exists():
+                index = json.loads(self.index_path.read_text(encoding="utf-8"))
+                self._data_name = index.get("pack") or self.pack_path.name
+                self.generation = int(index.get("generation", 0))
+                if self.data_path.exists():
+                    self.offsets = {slug: (span[0], span[1]) for slug, span in index.get("pages", {}).items()}
+                    self._size = int(index.get("size", 0))
+            self._loaded = True
+        return self
+
+    def __contains__(self, slug: str) -> bool:
+        return slug in self.load().offsets
+
+    def __len__(self) -> int:
+        return len(self.load().offsets)
+
+    def append(self, slug: str, payload: Dict[str, Any]) -> None:
+        data = (json.dumps(payload, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        self.load()
+        with self._lock:
+            if self._handle is None:
+                data_path = self.data_path
+                data_path.parent.mkdir(parents=True, exist_ok=True)
+                self._handle = data_path.open("r+b" if data_path.exists() else "w+b")
+                # Drop bytes appended by a run that never published its index
+                self._handle.truncate(self._size)
+                self._handle.seek(self._size)
+            self._handle.write(data)
+            self.offsets[slug] = (self._size, len(data))
+            self._size += len(data)
+
+    def get(self, slug: str) -> Optional[Dict[str, Any]]:
+        span = self.load().offsets.get(slug)
+        if span is None:
+            return None
+        with self._lock:
+            if self._handle is not None:
+                self._handle.flush()
+            data_path = self.data_path
+        with data_path.open("rb") as handle:
+            handle.seek(span[0])
+            return json.loads(handle.read(span[1]).decode("utf-8"))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Yield every live payload in slug order."""
+        for _, payload in self.items():
+            yield payload
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield ``(slug, payload)`` for every live page in slug order."""
+        self.load()
+        with self._lock:
+            if self._handle is not None:
+                self._handle.flush()
+            spans = sorted(self.offsets.items())
+            data_path = self.data_path
+        if not spans:
+            return
+        with data_path.open("rb") as handle:
+            for slug, (offset, length) in spans:
+                handle.seek(offset)
+                yield slug, json.loads(handle.read(length).decode("utf-8"))
+
+    def close(self, compact_ratio: float = 0.5) -> None:
+        """Flush appended pages, compact when garbage exceeds ``compact_ratio``, publish the index."""
+        with self._lock:
+            if self._handle is None:
+                return
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+            live = sum(length for _, length in self.offsets.values())
+            if self._size and (self._size - live) / self._size > compact_ratio:
+                self._compact_locked()
+            self._handle.close()
+            self._handle = None
+            self._write_index_locked()
+            self._remove_stale_locked()
+
+    def _compact_locked(self) -> None:
+        # Live pages go to the next generation's file; the current one stays
+        # untouched (and indexed) until _write_index_locked publishes the new pair
+        generation = self.generation + 1
+        new_path = self._generation_path(generation)
+        offsets: Dict[str, Tuple[int, int]] = {}
+        position = 0
+        with new_path.open("wb") as out:
+            for slug, (offset, length) in sorted(self.offsets.items()):
+                self._handle.seek(offset)
+                out.write(self._handle.read(length))
+                offsets[slug] = (position, length)
+                position += length
+            out.flush()
+            os.fsync(out.fileno())
+        self._handle.close()
+        self._handle = new_path.open("r+b")
+        self.generation = generation
+        self._data_name = new_path.name
+        self.offsets = offsets
+        self._size = position
+
+    def _write_index_locked(self) -> None:
+        index = {
+            "version": 1,
+            "pack": self._data_name,
+            "generation": self.generation,
+            "size": self._size,
+            "pages": {slug: list(span) for slug, span in sorted(self.offsets.items())},
+        }
+        atomic_write_text(self.index_path, json.dumps(index, separators=(",", ":")))
+
+    def _remove_stale_locked(self) -> None:
+        """Delete pack files the published index no longer names (superseded or orphaned generations)."""
+        candidates = [self.pack_path, *self.pack_path.parent.glob(f"{self.pack_path.stem}.*{self.pack_path.suffix}")]
+        for path in candidates:
+            if path.name != self._data_name:
+                path.unlink(missing_ok=True)
+
+    def retire(self) -> bool:
+        """Remove the index, then every pack file; returns whether there was anything to remove.
+
+        The index goes first so readers stop consulting the pack before its data disappears.
+        """
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            existed = self.index_path.exists()
+            self.index_path.unlink(missing_ok=True)
+            self._data_name = ""
+            self._remove_stale_locked()
+            self._data_name = self.pack_path.name
+            self.offsets = {}
+            self._size = 0
+            self.generation = 0
+            self._loaded = True
+        return existed
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write ``data`` to a temp file beside ``path`` and rename it into place."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+# Precompressed sibling suffix per format; brotli needs the optional ``brotli`` package
+PRECOMPRESS_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+def _brotli() -> Optional[Any]:
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def precompress_file(path: Path, formats: Tuple[str, ...], previous_hash: Optional[str] = None) -> Tuple[str, bool]:
+    """Write ``path.gz`` / ``path.br`` siblings unless the source hash is unchanged.
+
+    Returns the source's content hash and whether siblings were (re)written.
+    Output is deterministic (gzip mtime 0), so unchanged sources never churn.
+    Siblings get the source's mtime, which is how the server tells a sibling
+    that matches its source from a stale one.
+    """
+    # Stat before reading: if the source changes meanwhile, the stamp is stale rather than the content
+    stat = path.stat()
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    siblings = {fmt: path.with_name(path.name + PRECOMPRESS_SUFFIXES[fmt]) for fmt in formats}
+    written = digest != previous_hash or not all(sibling.exists() for sibling in siblings.values())
+    if written:
+        for fmt, sibling in siblings.items():
+            if fmt == "gzip":
+                blob = gzip.compress(data, compresslevel=9, mtime=0)
+            else:
+                blob = _brotli().compress(data, quality=11)
+            atomic_write_bytes(sibling, blob)
+    for sibling in siblings.values():
+        os.utime(sibling, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    return digest, written
+
+
+class RunRecorder:
+    """Structured instrumentation for one build: JSON-lines events plus a report.
+
+    ``emit`` appends one ``{"ts", "run", "event", ...}`` object per line to
+    ``events_path`` and counts it; ``add_tokens`` accumulates usage metadata.
+    ``finish`` writes the aggregate report (counts, tokens, per-stage timing
+    percentiles plus whatever the caller adds) to ``report_path``.
+    """
+
+    def __init__(self, events_path: Path, report_path: Path) -> None:
+        self.events_path = events_path
+        self.report_path = report_path
+        self.run_id = ""
+        self.counts: Dict[str, int] = {}
+        self.tokens = {"prompt": 0, "output": 0, "total": 0}
+        self._started = 0.0
+        self._handle: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._handle is not None
+
+    def start(self, **fields: Any) -> None:
+        self.run_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{os.getpid()}"
+        self.counts = {}
+        self.tokens = {"prompt": 0, "output": 0, "total": 0}
+        self._started = time.perf_counter()
+        self.events_path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = self.events_path.open("w", encoding="utf-8")
+        self.emit("run_start", **fields)
+
+    def emit(self, event: str, **fields: Any) -> None:
+        record = {"ts": datetime.utcnow().isoformat(), "run": self.run_id, "event": event, **fields}
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self.counts[event] = self.counts.get(event, 0) + 1
+            if self._handle is not None:
+                self._handle.write(line + "\n")
+
+    def add_tokens(self, usage: Any) -> Dict[str, int]:
+        """Accumulate a response's ``usage_metadata`` (or a batch result's
+        ``usageMetadata`` dict); returns this call's counts."""
+        if isinstance(usage, dict):
+            counts = {
+                "prompt": usage.get("promptTokenCount") or 0,
+                "output": usage.get("candidatesTokenCount") or 0,
+                "total": usage.get("totalTokenCount") or 0,
+            }
+        else:
+            counts = {
+                "prompt": getattr(usage, "prompt_token_count", None) or 0,
+                "output": getattr(usage, "candidates_token_count", None) or 0,
+                "total": getattr(usage, "total_token_count", None) or 0,
+            }
+        with self._lock:
+            for key, value in counts.items():
+                self.tokens[key] += value
+        return counts
+
+    @staticmethod
+    def stage_summary(timings: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+        summary = {}
+        for stage, values in sorted(timings.items()):
+            ordered = sorted(values)
+            summary[stage] = {
+                "count": len(ordered),
+                "total": round(sum(ordered), 3),
+                "p50": round(ordered[(len(ordered) - 1) // 2], 4),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+                "max": round(ordered[-1], 4),
+            }
+        return summary
+
+    def finish(self, timings: Dict[str, List[float]], **fields: Any) -> Dict[str, Any]:
+        seconds = round(time.perf_counter() - self._started, 3)
+        self.emit("run_end", seconds=seconds)
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            report = {
+                "run": self.run_id,
+                "finished": datetime.utcnow().isoformat(),
+                "seconds": seconds,
+                "events": dict(sorted(self.counts.items())),
+                "tokens": dict(self.tokens),
+                **fields,
+                "stages": self.stage_summary(timings),
+            }
+        self.report_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.report_path, json.dumps(report, indent=2))
+        return report
+
+
+SECTION_NAMES = ("intro", "benefits", "workflow", "steps", "results", "faq")
+
+
+def page_sections(content: Dict[str, Any]) -> Dict[str, str]:
+    return {name: content.get(f"{name}_content", "") for name in SECTION_NAMES}
+
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_FAQ_PAIR_RE = re.compile(r"<h4[^>]*>(.*?)</h4>\s*<p[^>]*>(.*?)</p>", flags=re.S | re.I)
+
+# Phrases that indicate templated, low-quality content
+GENERIC_PHRASES = (
+    "Automating .* gives .* teams a predictable way",
+    "This guide walks through the exact playbook",
+    "Eliminate low-value tasks inside your .* workflow",
+    "Most .* builds launch in 2-3 weeks",
+    "Teams typically reclaim 10-20 hours",
+)
+# Each phrase is compiled once and paired with its longest literal run, lowercased:
+# the regex only runs on text that contains that run
+_GENERIC_RES = tuple(
+    (max(re.split(r"\.\*", phrase), key=len).lower(), re.compile(phrase, re.I)) for phrase in GENERIC_PHRASES
+)
+
+
+def extract_faq_items(faq_html: str) -> List[Dict[str, str]]:
+    """Derive structured FAQ items from <h4>/<p> HTML for JSON-LD."""
+    return [
+        {"q": _TAG_RE.sub("", q).strip(), "a": _TAG_RE.sub("", a).strip()}
+        for q, a in _FAQ_PAIR_RE.findall(faq_html or "")
+    ]
+
+
+class PageText:
+    """Plain text and derived metrics for a page's sections, computed in one walk.
+
+    Each string value of ``content`` is stripped of tags once; the word count
+    (read time), intro excerpt, FAQ items and near-duplicate text all come from
+    that pass. With ``industry`` the same walk also records the quality gate's
+    inputs per section (which GENERIC_PHRASES match the raw HTML and how often
+    the industry is mentioned), and ``update`` rescans only the sections a
+    retry replaced.
+    """
+
+    def __init__(self, content: Dict[str, Any], industry: Optional[str] = None) -> None:
+        self.industry = industry.lower() if industry is not None else None
+        self.plain: Dict[str, str] = {}
+        self.word_counts: Dict[str, int] = {}
+        self.generic_hits: Dict[str, Tuple[int, ...]] = {}
+        self.industry_mentions: Dict[str, int] = {}
+        self.faq_items: List[Dict[str, str]] = []
+        self.update(content)
+
+    def update(self, content: Dict[str, Any]) -> None:
+        for key, html in content.items():
+            if not isinstance(html, str):
+                continue
+            plain = _TAG_RE.sub("", html) if "<" in html else html
+            self.plain[key] = plain
+            self.word_counts[key] = len(plain.split())
+            if key == "faq_content":
+                self.faq_items = extract_faq_items(html)
+            if self.industry is not None:
+                lowered = html.lower()
+                self.generic_hits[key] = tuple(
+                    i for i, (literal, pattern) in enumerate(_GENERIC_RES) if literal in lowered and pattern.search(html)
+                )
+                self.industry_mentions[key] = lowered.count(self.industry)
+
+    @property
+    def words(self) -> int:
+        return sum(self.word_counts.values())
+
+    @property
+    def read_time(self) -> int:
+        return max(1, round(self.words / 200))
+
+    @property
+    def excerpt(self) -> str:
+        """First sentence of the intro."""
+        intro = self.plain.get("intro_content", "")
+        return intro.split(". ")[0].strip() if intro else ""
+
+    @property
+    def text(self) -> str:
+        """Plain text of the six sections, for near-duplicate signatures."""
+        return " ".join(self.plain.get(f"{name}_content", "") for name in SECTION_NAMES)
+
+    def too_generic(self) -> bool:
+        """Three or more distinct generic phrases, or fewer than three industry mentions."""
+        phrases = {index for hits in self.generic_hits.values() for index in hits}
+        return len(phrases) >= 3 or sum(self.industry_mentions.values()) < 3
+
+    def generic_sections(self) -> List[str]:
+        """Section keys responsible for a failed quality gate (all of them if none stands out)."""
+        flagged = [key for key in self.generic_hits if self.generic_hits[key] or not self.industry_mentions[key]]
+        return flagged or list(self.generic_hits)
+
+
+_TEMPLATE_LOCK = threading.Lock()
+_ENVIRONMENTS: Dict[Tuple[str, Optional[str]], Environment] = {}
+
+
+def load_template(templates_dir: Path, name: str, bytecode_cache_dir: Optional[Path] = None) -> Template:
+    """Compile a page template once per process through a cached Jinja Environment.
+
+    The Environment's own template cache recompiles only when the source file
+    changes. With ``bytecode_cache_dir`` the compiled code is also persisted, so
+    new processes (render workers, later runs) skip parsing. Environment defaults
+    match ``jinja2.Template``, so output is identical.
+    """
+    key = (str(templates_dir), str(bytecode_cache_dir) if bytecode_cache_dir else None)
+    with _TEMPLATE_LOCK:
+        environment = _ENVIRONMENTS.get(key)
+        if environment is None:
+            from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+            bytecode_cache = None
+            if bytecode_cache_dir is not None:
+                bytecode_cache_dir.mkdir(parents=True, exist_ok=True)
+                bytecode_cache = FileSystemBytecodeCache(str(bytecode_cache_dir))
+            environment = _ENVIRONMENTS[key] = Environment(
+                loader=FileSystemLoader(str(templates_dir)), bytecode_cache=bytecode_cache
+            )
+        return environment.get_template(name)
+
+
+# Template used by render worker processes, set by _init_render_worker
+_WORKER_TEMPLATE: Optional[Template] = None
+
+
+def _init_render_worker(template_spec: Optional[Tuple[Path, str, Optional[Path]]]) -> None:
+    global _WORKER_TEMPLATE
+    _WORKER_TEMPLATE = load_template(*template_spec) if template_spec is not None else None
+
+
+def render_page(job: Dict[str, Any], template: Optional[Template] = None) -> Dict[str, Any]:
+    """Render stage: turn a produced job into the page payload, JSON text and HTML.
+
+    Pure CPU work with no generator state, so it can run in a worker process;
+    there ``template`` is omitted and the worker's compiled template is used.
+    """
+    if template is None:
+        template = _WORKER_TEMPLATE
+    timings: Dict[str, float] = {}
+    combo = job["combo"]
+    tool, use_case, industry = combo["tool"], combo["use_case"], combo["industry"]
+    tool_name, use_case_name, industry_name = tool["name"], use_case["name"], industry["name"]
+    content = dict(job["content"])
+    slug = job["slug"]
+
+    # One pass over the sections: FAQ items for JSON-LD, read time and excerpt
+    started = time.perf_counter()
+    page_text = PageText(content)
+    content["faq_items"] = page_text.faq_items
+    timings["faq_extraction"] = time.perf_counter() - started
+
+    title = f"{tool_name} for {use_case_name.title()} in {industry_name.title()}"
+    meta_description = (
+        f"Learn how {tool_name} automates {use_case_name} for {industry_name} teams with a complete workflow."
+    )
+    date_published = job["date_published"]
+    page_payload: Dict[str, Any] = {
+        "slug": slug,
+        "title": title,
+        "metaDescription": meta_description,
+        "tool": tool_name,
+        "useCase": use_case_name,
+        "industry": industry_name,
+        "datePublished": date_published,
+        "readTime": page_text.read_time,
+        "excerpt": page_text.excerpt,
+        "sections": page_sections(content),
+        "source": {
+            "tool": tool,
+            "use_case": use_case,
+            "industry": industry,
+        },
+        "dateModified": job["date_modified"],
+    }
+
+    started = time.perf_counter()
+    json_text = json.dumps(page_payload, indent=2, ensure_ascii=False)
+    timings["serialize"] = time.perf_counter() - started
+
+    html_content: Optional[str] = None
+    if template is not None:
+        started = time.perf_counter()
+        html_content = template.render(
+            title=title,
+            meta_description=meta_description,
+            slug=slug,
+            tool=tool_name,
+            use_case=use_case_name,
+            industry=industry_name,
+            date_published=date_published,
+            **content,
+        )
+        timings["render"] = time.perf_counter() - started
+
+    return {
+        "slug": slug,
+        "payload": page_payload,
+        "json_text": json_text,
+        "html": html_content,
+        "journal": job["journal"],
+        "started": job["started"],
+        "timings": timings,
+    }
+
+
+def rerender_page(payload: Dict[str, Any], html_dir: Path, template: Optional[Template] = None) -> Optional[bool]:
+    """Render one stored page payload and rewrite its HTML only if the output changed.
+
+    Returns True when the file was written, False when it was already current,
+    and None when the payload could not be rendered.
+    """
+    if template is None:
+        template = _WORKER_TEMPLATE
+    slug = payload.get("slug")
+    if not slug or template is None:
+        return None
+
+    sections = payload.get("sections", {})
+    content: Dict[str, Any] = {f"{name}_content": sections.get(name, "") for name in SECTION_NAMES}
+    content["faq_items"] = extract_faq_items(content["faq_content"])
+    html_content = template.render(
+        title=payload.get("title", ""),
+        meta_description=payload.get("metaDescription", ""),
+        slug=slug,
+        tool=payload.get("tool"),
+        use_case=payload.get("useCase"),
+        industry=payload.get("industry"),
+        date_published=payload.get("datePublished"),
+        **content,
+    )
+
+    html_path = html_dir / f"{slug}.html"
+    try:
+        if html_path.read_text(encoding="utf-8") == html_content:
+            return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    atomic_write_text(html_path, html_content)
+    return True
 
 
 class ProgrammaticSEOGenerator:
     """Generate programmatic SEO landing pages and supporting assets."""
 
-    def __init__(self, api_key: Optional[str] = None) -> None:
+    GENERIC_PHRASES = GENERIC_PHRASES
+
+    def __init__(self, api_key: Optional[str] = None, client: Any = None, root_dir: Optional[Path] = None) -> None:
         self.api_key = api_key or os.getenv("GEMINI_API_KEY", "")
-        self.client = genai.Client(api_key=self.api_key) if self.api_key else None
+        # ``client`` lets benchmarks and tests inject a stand-in for genai.Client;
+        # otherwise one is created on first use (see the ``client`` property)
+        self._client = client
+        self._model_client: Optional[ModelClient] = None
+        self._client_lock = threading.Lock()
 
         # Config knobs (env-overridable)
         self.model = os.getenv("MODEL", "gemini-2.5-flash")
         self.temperature = float(os.getenv("TEMPERATURE", "0.2"))
         self.max_output_tokens = int(os.getenv("MAX_OUTPUT_TOKENS", "4096"))
         self.retry_count = int(os.getenv("RETRY_COUNT", "2"))
-        self.ai_sectioned = os.getenv("AI_SECTIONED", "false").strip().lower() in {"1", "true", "yes", "y", "on"}
-
-        self.root_dir = Path(__file__).resolve().parents[1]
+        self.ai_sectioned = _env_flag("AI_SECTIONED")
+        # Max pages generated concurrently; 1 keeps the original sequential behaviour
+        self.concurrency = max(1, int(os.getenv("CONCURRENCY", "1")))
+        # Concurrent section requests per page in AI_SECTIONED mode
+        self.section_concurrency = max(1, int(os.getenv("SECTION_CONCURRENCY", "6")))
+        # "sections" re-rolls only the sections that failed the quality gate; "page" re-rolls all six
+        self.quality_retry_scope = os.getenv("QUALITY_RETRY_SCOPE", "sections").strip().lower()
+        # Industries per model call for pages sharing a tool and use case (JSON mode only; 1 disables)
+        self.group_size = max(1, int(os.getenv("GROUP_SIZE", "1")))
+        # Sitemap sharding; shards are gzipped when SITEMAP_GZIP is set
+        self.sitemap_shard_size = min(SITEMAP_MAX_URLS, max(1, int(os.getenv("SITEMAP_SHARD_SIZE", str(SITEMAP_MAX_URLS)))))
+        self.sitemap_gzip = _env_flag("SITEMAP_GZIP")
+        # Processes for the render stage (0 renders inline) and pages per write batch
+        self.render_workers = max(0, int(os.getenv("RENDER_WORKERS", "0")))
+        self.write_batch_size = max(1, int(os.getenv("WRITE_BATCH_SIZE", "32")))
+        # Combination planning: PLAN_ORDER is nested, stratified or priority (weights.csv);
+        # unset, it is priority under a budget and stratified otherwise
+        self.plan_order = os.getenv("PLAN_ORDER", "").strip().lower()
+        # Dry-run cost model: USD per million tokens and the expected share of
+        # max_output_tokens a reply actually uses
+        self.price_input_per_mtok = float(os.getenv("PRICE_INPUT_PER_MTOK", "0.30"))
+        self.price_output_per_mtok = float(os.getenv("PRICE_OUTPUT_PER_MTOK", "2.50"))
+        self.output_token_ratio = float(os.getenv("OUTPUT_TOKEN_RATIO", "0.5"))
+        # Near-duplicate detection: DEDUP_ACTION is "flag", "regenerate" or "off"
+        self.dedup_action = os.getenv("DEDUP_ACTION", "flag").strip().lower()
+        if self.dedup_action not in {"flag", "regenerate", "off"}:
+            raise ValueError(f"DEDUP_ACTION must be flag, regenerate or off, not {self.dedup_action!r}")
+        self.dedup_threshold = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+        self.dedup_index: Optional[NearDuplicateIndex] = None
+        # Page storage: "files" (one JSON per slug), "pack" (PagePack) or "both"
+        self.page_store = os.getenv("PAGE_STORE", "files").strip().lower()
+        if self.page_store not in {"files", "pack", "both"}:
+            raise ValueError(f"PAGE_STORE must be files, pack or both, not {self.page_store!r}")
+        # Skip combinations whose inputs and prompt version match the build journal
+        self.incremental = _env_flag("INCREMENTAL")
+        # Per-run spend caps (0 disables); a budgeted run stops admitting pages once
+        # the next one no longer fits, and the next run resumes where it stopped
+        self.budget_tokens = int(os.getenv("BUDGET_TOKENS") or 0)
+        self.budget_usd = float(os.getenv("BUDGET_USD") or 0)
+        self.budget: Optional[TokenBudget] = None
+        # Plan only combinations touching source rows changed since the last complete build
+        self.changed_only = _env_flag("CHANGED_ONLY")
+        # kind -> row name -> (row, content hash), filled by load_data_files
+        self._source_rows: Dict[str, Dict[str, Tuple[Dict[str, str], str]]] = {}
+
+        # Per-stage wall-clock durations in seconds, filled in by _timed
+        self.timings: Dict[str, List[float]] = {}
+        self._timings_lock = threading.Lock()
+
+        self.root_dir = Path(root_dir) if root_dir else Path(__file__).resolve().parents[1]
         self.data_root = self.root_dir / "data" / "programmatic-seo"
         self.output_dir = self.data_root / "pages"
         self.templates_dir = self.data_root / "templates"
         self.html_output_dir = self.root_dir / "public" / "automation"
 
-        for path in (self.data_root, self.output_dir, self.templates_dir, self.html_output_dir):
-            path.mkdir(parents=True, exist_ok=True)
-
         self.template_path = self.templates_dir / "page_template.html"
+        self.journal = BuildJournal(self.data_root / "build" / "journal.jsonl")
+        self.pack = PagePack(self.data_root / "pages.pack.jsonl", self.data_root / "pages.pack.idx.json")
+
+        # Response cache; NO_CACHE=true bypasses it entirely
+        self.cache = ResponseCache(
+            Path(os.getenv("CACHE_DIR", str(self.root_dir / ".cache" / "programmatic-seo"))),
+            max_bytes=int(float(os.getenv("CACHE_MAX_MB", "512")) * 1024 * 1024),
+            max_age_seconds=float(os.getenv("CACHE_MAX_AGE_DAYS", "30")) * 86400,
+            enabled=not _env_flag("NO_CACHE"),
+        )
+
+        # Run instrumentation: JSON-lines events and an end-of-run report.
+        # MAX_FALLBACK_RATE (0-1) flags runs where too many pages used fallback copy
+        self.events = RunRecorder(
+            Path(os.getenv("EVENT_LOG", str(self.data_root / "build" / "events.jsonl"))),
+            Path(os.getenv("RUN_REPORT", str(self.data_root / "build" / "run_report.json"))),
+        )
+        # Precompressed .gz/.br siblings for HTML, sitemaps and index.json: PRECOMPRESS is
+        # off (default), "auto" (gzip, plus brotli when installed) or a list like "gzip,br"
+        self.precompress = os.getenv("PRECOMPRESS", "off").strip().lower()
+        self.precompress_workers = max(1, int(os.getenv("PRECOMPRESS_WORKERS", str(os.cpu_count() or 1))))
+        # Batch mode (--batch): BATCH_BACKEND is "genai" (Gemini Batch API) or "local";
+        # BATCH_SYNC_FALLBACK=true re-requests items the batch failed synchronously
+        self.batch_backend_name = os.getenv("BATCH_BACKEND", "genai").strip().lower()
+        self.batch_backend: Optional[Any] = None
+        self.batch_dir = Path(os.getenv("BATCH_DIR", str(self.root_dir / ".cache" / "programmatic-seo-batch")))
+        self.batch_poll_seconds = float(os.getenv("BATCH_POLL_SECONDS", "30"))
+        self.batch_max_wait_seconds = float(os.getenv("BATCH_MAX_WAIT_HOURS", "24")) * 3600
+        self.batch_sync_fallback = _env_flag("BATCH_SYNC_FALLBACK")
+        self.offline = False
+        max_fallback_rate = os.getenv("MAX_FALLBACK_RATE", "").strip()
+        self.max_fallback_rate = float(max_fallback_rate) if max_fallback_rate else None
+        self.run_report: Optional[Dict[str, Any]] = None
+
+    @property
+    def client(self) -> Any:
+        """The genai client, created (and the SDK imported) only when a stage needs it."""
+        if self._client is None and self.api_key:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = _genai().Client(api_key=self.api_key)
+        return self._client
+
+    @property
+    def model_client(self) -> Optional[ModelClient]:
+        if self._model_client is None and self.client:
+            with self._client_lock:
+                if self._model_client is None:
+                    model_client = ModelClient(
+                        self.client,
+                        rpm=float(os.getenv("RATE_LIMIT_RPM", "0")),
+                        tpm=float(os.getenv("RATE_LIMIT_TPM", "0")),
+                        max_concurrency=int(os.getenv("MODEL_MAX_CONCURRENCY", "16")),
+                        max_retries=int(os.getenv("MODEL_MAX_RETRIES", "5")),
+                        base_delay=float(os.getenv("BACKOFF_BASE_SECONDS", "1")),
+                        max_delay=float(os.getenv("BACKOFF_MAX_SECONDS", "60")),
+                    )
+                    model_client.on_event = self.events.emit
+                    self._model_client = model_client
+        return self._model_client
+
+    @contextmanager
+    def _timed(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._timings_lock:
+                self.timings.setdefault(stage, []).append(elapsed)
+
+    @property
+    def prompt_version(self) -> str:
+        mode = "sectioned" if self.ai_sectioned else "json"
+        return f"{PROMPT_VERSION}/{mode}/{self.model}"
+
+    @staticmethod
+    def page_slug(tool_name: str, use_case_name: str, industry_name: str) -> str:
+        from slugify import slugify
+
+        return "-".join((slugify(tool_name), slugify(use_case_name), slugify(industry_name)))
+
+    def combo_inputs(self, combo: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+        inputs = {}
+        for kind, row in combo.items():
+            # Reuse the hash computed while loading, unless the row was built elsewhere
+            cached = self._source_rows.get(kind, {}).get(row.get("name", ""))
+            inputs[kind] = cached[1] if cached is not None and cached[0] is row else content_hash(row)
+        return inputs
 
-    def create_sample_data(self) -> None:
+    def create_sample_data(self, overwrite: bool = False) -> None:
         tools_data = [
             {"name": "n8n", "category": "workflow_automation", "description": "Open-source workflow automation"},
             {"name": "Make.com", "category": "workflow_automation", "description": "Visual automation platform"},
@@ -70,18 +1772,22 @@ class ProgrammaticSEOGenerator:
             {"name": "restaurants", "category": "hospitality", "description": "Food service businesses"},
         ]
 
+        self.data_root.mkdir(parents=True, exist_ok=True)
         for filename, rows in (
             ("tools.csv", tools_data),
             ("use_cases.csv", use_cases_data),
             ("industries.csv", industries_data),
         ):
             filepath = self.data_root / filename
+            if filepath.exists() and not overwrite:
+                print(f"{filename} already exists; skipping sample data")
+                continue
             with filepath.open("w", newline="", encoding="utf-8") as handle:
                 writer = csv.DictWriter(handle, fieldnames=rows[0].keys())
                 writer.writeheader()
                 writer.writerows(rows)
 
-        print("Sample data created in data/programmatic-seo")
+        print("Sample data ready in data/programmatic-seo")
 
     def create_html_template(self) -> None:
         if self.template_path.exists():
@@ -111,10 +1817,11 @@ class ProgrammaticSEOGenerator:
 </html>
 """
 
+        self.templates_dir.mkdir(parents=True, exist_ok=True)
         self.template_path.write_text(template_content, encoding="utf-8")
         print("Template created at", self.template_path)
 
-    def _extract_json_text(self, raw: Optional[str]) -> Optional[str]:
+    def _extract_json_text(self, raw: Optional[str], array: bool = False) -> Optional[str]:
         if not raw:
             return None
         text = raw.strip()
@@ -125,7 +1832,7 @@ class ProgrammaticSEOGenerator:
         if text.endswith("```"):
             text = text[:-3]
         text = text.strip()
-        m = re.search(r"\{[\s\S]*\}", text)
+        m = re.search(r"\[[\s\S]*\]" if array else r"\{[\s\S]*\}", text)
         return m.group(0).strip() if m else (text or None)
 
     @staticmethod
@@ -143,74 +1850,123 @@ class ProgrammaticSEOGenerator:
             text = text[:-3]
         return text.strip()
 
-    def generate_content_with_ai(self, tool: str, use_case: str, industry: str) -> Dict[str, str]:
+    def _call_model(
+        self, contents: str, config: Dict[str, Any], use_cache: bool = True, **event_fields: Any
+    ) -> str:
+        """Issue one generate_content call, served from the response cache when possible.
+
+        Fresh responses are always written back to the cache, so ``use_cache=False``
+        replaces a stale or rejected entry rather than bypassing the cache forever.
+        ``event_fields`` (slug, section) are attached to the call's events. With
+        ``offline`` set (batch ingestion) only cached replies are served.
+        """
+        key = self.cache.key(self.model, contents, config)
+        if use_cache or self.offline:
+            cached = self.cache.get(key)
+            if cached:
+                self.events.emit("cache_hit", **event_fields)
+                return cached
+        if self.offline:
+            # Batch ingestion: anything the batch didn't answer falls back per item
+            self.events.emit("model_error", error="no batch result", **event_fields)
+            raise FatalModelError("No batch result for this request")
+
+        started = time.perf_counter()
+        try:
+            with self._timed("model"):
+                response = self.model_client.generate(
+                    self.model, contents, _genai().types.GenerateContentConfig(**config)
+                )
+        except FatalModelError as exc:
+            self.events.emit("model_error", error=str(exc), **event_fields)
+            raise
+        tokens = self.events.add_tokens(getattr(response, "usage_metadata", None))
+        text = getattr(response, "text", None) or ""
+        if self.budget is not None:
+            # Without usage metadata, charge ~4 characters per token
+            self.budget.charge(
+                event_fields.get("slug") or event_fields.get("group"),
+                tokens["prompt"] or len(contents) // 4,
+                tokens["output"] or len(text) // 4,
+            )
+        self.events.emit(
+            "model_call",
+            latency_ms=round((time.perf_counter() - started) * 1000, 1),
+            prompt_tokens=tokens["prompt"],
+            output_tokens=tokens["output"],
+            **event_fields,
+        )
+        self.cache.set(key, text)
+        return text
+
+    def _fallback_content(
+        self, tool: str, use_case: str, industry: str, reason: str, section: Optional[str] = None
+    ) -> Dict[str, str]:
+        self.events.emit(
+            "fallback",
+            slug=self.page_slug(tool, use_case, industry),
+            section=section,
+            reason=reason,
+        )
+        return self.get_fallback_content(tool, use_case, industry)
+
+    def generate_content_with_ai(
+        self, tool: str, use_case: str, industry: str, refresh: bool = False
+    ) -> Dict[str, str]:
+        """Generate the six page sections; ``refresh`` skips cached replies."""
         if not self.client:
-            return self.get_fallback_content(tool, use_case, industry)
+            return self._fallback_content(tool, use_case, industry, "no_client")
+        slug = self.page_slug(tool, use_case, industry)
 
         if self.ai_sectioned:
-            # Try up to 2 times to get quality content
+            # Try up to 2 times to get quality content; the second attempt re-rolls only
+            # the sections that tripped the gate unless QUALITY_RETRY_SCOPE=page
+            content: Dict[str, str] = {}
+            page_text: Optional[PageText] = None
             for quality_attempt in range(2):
-                content = self._generate_content_with_ai_sectioned(tool, use_case, industry)
+                if page_text is None:
+                    content = self._generate_content_with_ai_sectioned(tool, use_case, industry, refresh=refresh)
+                    page_text = PageText(content, industry)
+                else:
+                    if self.budget is not None and self.budget.exhausted:
+                        print(f"  ⚠️  Budget reached; keeping the current content for {industry}")
+                        break
+                    keys = None if self.quality_retry_scope == "page" else page_text.generic_sections()
+                    retried = self._generate_content_with_ai_sectioned(
+                        tool, use_case, industry, refresh=True, keys=keys
+                    )
+                    content.update(retried)
+                    # Only the re-rolled sections are rescanned
+                    page_text.update(retried)
 
                 # Check if content is too generic
-                if not self._is_content_too_generic(content, industry):
+                if not page_text.too_generic():
                     return content
 
+                self.events.emit(
+                    "quality_reject",
+                    slug=slug,
+                    attempt=quality_attempt + 1,
+                    sections=page_text.generic_sections(),
+                )
                 print(f"  ⚠️  Content too generic for {industry}, retrying... (attempt {quality_attempt + 1}/2)")
 
             # If still generic after retries, warn but use it
             print(f"  ⚠️  WARNING: Content for {industry} may be generic")
             return content
 
-        prompt = f"""Create content for a programmatic SEO page about automating {use_case} for {industry} using {tool}.
-
-Strictly follow these output rules:
-- Output exactly ONE JSON object with these keys (all values must be strings):
-  - intro_content: 2-3 paragraph introduction explaining the automation opportunity
-  - benefits_content: HTML <ul><li> list of 3-4 benefits
-  - workflow_content: 2-3 sentence workflow overview in HTML
-  - steps_content: HTML <ol><li> list of 4-6 implementation steps
-  - results_content: 2-3 paragraph results and ROI section
-  - faq_content: 3-4 FAQ entries using <h4> for questions and <p> for answers
-- Do NOT include markdown code fences, backticks, or any extra prose before/after the JSON.
-- Ensure valid JSON: double-quoted keys/strings, no trailing commas, and escape quotes inside strings.
-"""
-
-        required_keys = [
-            "intro_content",
-            "benefits_content",
-            "workflow_content",
-            "steps_content",
-            "results_content",
-            "faq_content",
-        ]
+        contents, config = self._page_request(tool, use_case, industry)
+        required_keys = [f"{name}_content" for name in SECTION_NAMES]
 
         for attempt in range(self.retry_count + 1):
             try:
-                response_schema = None
-                try:
-                    Schema = genai.types.Schema  # type: ignore[attr-defined]
-                    Type = genai.types.Type      # type: ignore[attr-defined]
-                    response_schema = Schema(
-                        type=Type.OBJECT,
-                        properties={k: Schema(type=Type.STRING) for k in required_keys},
-                        required=required_keys,
-                    )
-                except Exception:
-                    response_schema = None
-
-                response = self.client.models.generate_content(
-                    model=self.model,
-                    contents=f"You are a helpful assistant that generates SEO content in JSON format.\n\n{prompt}",
-                    config=genai.types.GenerateContentConfig(
-                        temperature=self.temperature,
-                        max_output_tokens=self.max_output_tokens,
-                        response_mime_type="application/json",
-                        **({"response_schema": response_schema} if response_schema else {}),
-                    ),
+                response_text = self._call_model(
+                    contents,
+                    config,
+                    # A cached reply that failed validation must not be served again
+                    use_cache=not refresh and attempt == 0,
+                    slug=slug,
                 )
-
-                response_text = getattr(response, "text", None)
                 response_text = self._extract_json_text(response_text)
                 if not response_text:
                     raise ValueError("Empty response from model")
@@ -229,6 +1985,7 @@ Strictly follow these output rules:
                         val = content_data.get(key)
                         if not isinstance(val, str) or not val.strip():
                             content_data[key] = fallback[key]
+                            self.events.emit("fallback", slug=slug, section=key, reason="missing_key")
 
                 for key in required_keys:
                     if not isinstance(content_data.get(key), str):
@@ -236,10 +1993,13 @@ Strictly follow these output rules:
 
                 return content_data
             except Exception as exc:
-                if attempt < self.retry_count:
+                # Transport retries already happened inside ModelClient; only
+                # re-sample on invalid output
+                if attempt < self.retry_count and not isinstance(exc, FatalModelError):
+                    self.events.emit("invalid_output", slug=slug, attempt=attempt + 1, error=str(exc))
                     continue
                 print(f"Error generating AI content: {exc}")
-                return self.get_fallback_content(tool, use_case, industry)
+                return self._fallback_content(tool, use_case, industry, type(exc).__name__)
 
     @staticmethod
     def get_fallback_content(tool: str, use_case: str, industry: str) -> Dict[str, str]:
@@ -281,26 +2041,291 @@ Strictly follow these output rules:
             ),
         }
 
+    def _uses_fallback(self, content: Dict[str, Any], tool: str, use_case: str, industry: str) -> bool:
+        fallback = self.get_fallback_content(tool, use_case, industry)
+        return any(content.get(key) == value for key, value in fallback.items())
+
     @staticmethod
     def strip_html(html: str) -> str:
-        return re.sub(r"<[^>]+>", "", html)
+        return _TAG_RE.sub("", html)
 
     @staticmethod
     def estimate_read_time(blocks: Iterable[str]) -> int:
-        words = sum(len(ProgrammaticSEOGenerator.strip_html(block).split()) for block in blocks)
+        words = sum(len(_TAG_RE.sub("", block).split()) for block in blocks)
         return max(1, round(words / 200))
 
+    def iter_source_rows(self, kind: str, errors: List[str]) -> Iterator[Tuple[Dict[str, str], str]]:
+        """Stream the validated rows of one source CSV with their content hashes.
+
+        Rows are read one at a time; only names and slugs are kept for the
+        duplicate checks. Problems (missing columns, ragged rows, blank or
+        duplicate names, names whose slugs collide) are appended to ``errors``
+        and the offending row is skipped, so a single pass reports all of them.
+        """
+        from slugify import slugify
+
+        filename = SOURCE_FILES[kind]
+        filepath = self.data_root / filename
+        if not filepath.exists():
+            raise FileNotFoundError(f"Missing data file: {filepath}")
+        names: Dict[str, int] = {}
+        slugs: Dict[str, Tuple[str, int]] = {}
+        with filepath.open(encoding="utf-8-sig", newline="") as handle:
+            reader = csv.DictReader(handle)
+            header = [column.strip() for column in reader.fieldnames or ()]
+            missing = [column for column in SOURCE_REQUIRED_COLUMNS if column not in header]
+            if missing:
+                errors.append(f"{filename}: missing column(s) {', '.join(missing)}")
+                return
+            for raw in reader:
+                line = reader.line_num
+                if None in raw:
+                    errors.append(f"{filename}:{line}: more cells than header columns")
+                    continue
+                if any(value is None for value in raw.values()):
+                    errors.append(f"{filename}:{line}: fewer cells than header columns")
+                    continue
+                row = {key.strip(): value.strip() for key, value in raw.items()}
+                name = row["name"]
+                if not name:
+                    errors.append(f"{filename}:{line}: empty name")
+                    continue
+                key = name.casefold()
+                if key in names:
+                    errors.append(f"{filename}:{line}: duplicate name {name!r} (first on line {names[key]})")
+                    continue
+                names[key] = line
+                slug = slugify(name)
+                if not slug:
+                    errors.append(f"{filename}:{line}: name {name!r} has an empty slug")
+                    continue
+                if slug in slugs:
+                    other, other_line = slugs[slug]
+                    errors.append(
+                        f"{filename}:{line}: {name!r} and {other!r} (line {other_line}) share the slug {slug!r}"
+                    )
+                    continue
+                slugs[slug] = (name, line)
+                yield row, content_hash(row)
+
     def load_data_files(self) -> Dict[str, List[Dict[str, str]]]:
+        """Load the source CSVs, raising SourceDataError listing every invalid row."""
+        errors: List[str] = []
         datasets: Dict[str, List[Dict[str, str]]] = {}
-        for filename in ("tools.csv", "use_cases.csv", "industries.csv"):
-            filepath = self.data_root / filename
-            if not filepath.exists():
-                raise FileNotFoundError(f"Missing data file: {filepath}")
-            with filepath.open(encoding="utf-8") as handle:
-                datasets[filename.split(".")[0]] = list(csv.DictReader(handle))
+        source_rows: Dict[str, Dict[str, Tuple[Dict[str, str], str]]] = {}
+        for kind, filename in SOURCE_FILES.items():
+            rows: List[Dict[str, str]] = []
+            hashes: Dict[str, Tuple[Dict[str, str], str]] = {}
+            for row, digest in self.iter_source_rows(kind, errors):
+                rows.append(row)
+                hashes[row["name"]] = (row, digest)
+            datasets[filename.split(".")[0]] = rows
+            source_rows[kind] = hashes
+        if errors:
+            raise SourceDataError(errors)
+        self._source_rows = source_rows
         return datasets
 
-    def _generate_content_with_ai_sectioned(self, tool: str, use_case: str, industry: str) -> Dict[str, str]:
+    def source_hashes(self) -> Dict[str, Dict[str, str]]:
+        """Row name -> content hash per kind, for the rows last loaded (or streamed now)."""
+        if self._source_rows:
+            return {kind: {name: digest for name, (_, digest) in rows.items()} for kind, rows in self._source_rows.items()}
+        errors: List[str] = []
+        hashes = {kind: {row["name"]: digest for row, digest in self.iter_source_rows(kind, errors)} for kind in SOURCE_FILES}
+        if errors:
+            raise SourceDataError(errors)
+        return hashes
+
+    @property
+    def _sources_snapshot_path(self) -> Path:
+        return self.data_root / "build" / "sources.json"
+
+    def source_diff(self) -> Optional[Dict[str, Dict[str, List[str]]]]:
+        """Rows added, changed and removed per kind since the last complete build.
+
+        Returns None when no build has recorded a snapshot yet.
+        """
+        hashes = self.source_hashes()
+        if not self._sources_snapshot_path.exists():
+            return None
+        previous = json.loads(self._sources_snapshot_path.read_text(encoding="utf-8")).get("sources", {})
+        diff: Dict[str, Dict[str, List[str]]] = {}
+        for kind, current in hashes.items():
+            before = previous.get(kind, {})
+            diff[kind] = {
+                "added": [name for name in current if name not in before],
+                "changed": [name for name, digest in current.items() if name in before and before[name] != digest],
+                "removed": [name for name in before if name not in current],
+            }
+        return diff
+
+    def save_source_snapshot(self) -> None:
+        self._sources_snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(
+            self._sources_snapshot_path,
+            json.dumps({"sources": self.source_hashes()}, sort_keys=True, ensure_ascii=False),
+        )
+
+    def _page_request(self, tool: str, use_case: str, industry: str) -> Tuple[str, Dict[str, Any]]:
+        """Contents and generation config for the single-call JSON page prompt."""
+        prompt = f"""Create content for a programmatic SEO page about automating {use_case} for {industry} using {tool}.
+
+Strictly follow these output rules:
+- Output exactly ONE JSON object with these keys (all values must be strings):
+  - intro_content: 2-3 paragraph introduction explaining the automation opportunity
+  - benefits_content: HTML <ul><li> list of 3-4 benefits
+  - workflow_content: 2-3 sentence workflow overview in HTML
+  - steps_content: HTML <ol><li> list of 4-6 implementation steps
+  - results_content: 2-3 paragraph results and ROI section
+  - faq_content: 3-4 FAQ entries using <h4> for questions and <p> for answers
+- Do NOT include markdown code fences, backticks, or any extra prose before/after the JSON.
+- Ensure valid JSON: double-quoted keys/strings, no trailing commas, and escape quotes inside strings.
+"""
+        required_keys = [f"{name}_content" for name in SECTION_NAMES]
+
+        response_schema = None
+        try:
+            Schema = _genai().types.Schema  # type: ignore[attr-defined]
+            Type = _genai().types.Type      # type: ignore[attr-defined]
+            response_schema = Schema(
+                type=Type.OBJECT,
+                properties={k: Schema(type=Type.STRING) for k in required_keys},
+                required=required_keys,
+            )
+        except Exception:
+            response_schema = None
+
+        config = {
+            "temperature": self.temperature,
+            "max_output_tokens": self.max_output_tokens,
+            "response_mime_type": "application/json",
+            **({"response_schema": response_schema} if response_schema else {}),
+        }
+        return f"You are a helpful assistant that generates SEO content in JSON format.\n\n{prompt}", config
+
+    @property
+    def grouped(self) -> bool:
+        return self.group_size > 1 and not self.ai_sectioned
+
+    def _group_request(self, tool: str, use_case: str, industries: List[str]) -> Tuple[str, Dict[str, Any]]:
+        """Contents and config asking for one page object per industry in a JSON array."""
+        listed = "\n".join(f"  {position}. {industry}" for position, industry in enumerate(industries, 1))
+        prompt = f"""Create content for programmatic SEO pages about automating {use_case} using {tool}, one page for each of these industries:
+{listed}
+
+Strictly follow these output rules:
+- Output exactly ONE JSON array with one object per industry, in the order listed above.
+- Each object has these keys (all values must be strings):
+  - industry: the industry name exactly as listed
+  - intro_content: 2-3 paragraph introduction explaining the automation opportunity for that industry
+  - benefits_content: HTML <ul><li> list of 3-4 benefits
+  - workflow_content: 2-3 sentence workflow overview in HTML
+  - steps_content: HTML <ol><li> list of 4-6 implementation steps
+  - results_content: 2-3 paragraph results and ROI section
+  - faq_content: 3-4 FAQ entries using <h4> for questions and <p> for answers
+- Each page must be written specifically for its industry; do not reuse copy between pages.
+- Do NOT include markdown code fences, backticks, or any extra prose before/after the JSON.
+- Ensure valid JSON: double-quoted keys/strings, no trailing commas, and escape quotes inside strings.
+"""
+        item_keys = ["industry"] + [f"{name}_content" for name in SECTION_NAMES]
+
+        response_schema = None
+        try:
+            Schema = _genai().types.Schema  # type: ignore[attr-defined]
+            Type = _genai().types.Type      # type: ignore[attr-defined]
+            response_schema = Schema(
+                type=Type.ARRAY,
+                items=Schema(
+                    type=Type.OBJECT,
+                    properties={k: Schema(type=Type.STRING) for k in item_keys},
+                    required=item_keys,
+                ),
+            )
+        except Exception:
+            response_schema = None
+
+        config = {
+            "temperature": self.temperature,
+            "max_output_tokens": min(GROUP_MAX_OUTPUT_TOKENS, self.max_output_tokens * len(industries)),
+            "response_mime_type": "application/json",
+            **({"response_schema": response_schema} if response_schema else {}),
+        }
+        return f"You are a helpful assistant that generates SEO content in JSON format.\n\n{prompt}", config
+
+    def _group_key(self, tool: str, use_case: str, industries: List[str]) -> str:
+        return self.page_slug(tool, use_case, "+".join(industries))
+
+    def group_combos(
+        self, combos: Iterable[Dict[str, Dict[str, str]]]
+    ) -> Iterator[List[Dict[str, Dict[str, str]]]]:
+        """Gather combinations sharing a tool and use case into groups of up to GROUP_SIZE.
+
+        Full groups are yielded as soon as they fill; partial ones once ``combos``
+        is exhausted. Grouping is deterministic for a given plan, so batch
+        requests and later builds produce the same group prompts.
+        """
+        pending: Dict[Tuple[str, str], List[Dict[str, Dict[str, str]]]] = {}
+        for combo in combos:
+            key = (combo["tool"]["name"], combo["use_case"]["name"])
+            group = pending.setdefault(key, [])
+            group.append(combo)
+            if len(group) >= self.group_size:
+                yield pending.pop(key)
+        yield from pending.values()
+
+    def generate_group_content(
+        self, tool: str, use_case: str, industries: List[str]
+    ) -> Dict[str, Optional[Dict[str, str]]]:
+        """Generate pages for several industries in one call.
+
+        Each array item is validated on its own; industries whose item is
+        missing or incomplete map to None so the caller can regenerate just
+        those pages individually.
+        """
+        required_keys = [f"{name}_content" for name in SECTION_NAMES]
+        results: Dict[str, Optional[Dict[str, str]]] = {industry: None for industry in industries}
+        contents, config = self._group_request(tool, use_case, industries)
+        group = self._group_key(tool, use_case, industries)
+
+        for attempt in range(self.retry_count + 1):
+            try:
+                response_text = self._extract_json_text(
+                    self._call_model(contents, config, use_cache=attempt == 0, group=group, pages=len(industries)),
+                    array=True,
+                )
+                items = json.loads(response_text) if response_text else None
+                if not isinstance(items, list):
+                    raise ValueError("Expected a JSON array of pages")
+                break
+            except FatalModelError as exc:
+                print(f"Error generating grouped content for {tool} / {use_case}: {exc}")
+                return results
+            except Exception as exc:
+                self.events.emit("invalid_output", group=group, attempt=attempt + 1, error=str(exc))
+        else:
+            return results
+
+        by_name = {industry.casefold(): industry for industry in industries}
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            industry = by_name.get(str(item.get("industry", "")).strip().casefold())
+            if industry is None and position < len(industries):
+                industry = industries[position]
+            if industry is None or results.get(industry) is not None:
+                continue
+            if all(isinstance(item.get(key), str) and item[key].strip() for key in required_keys):
+                results[industry] = {key: item[key] for key in required_keys}
+
+        for industry, content in results.items():
+            if content is None:
+                self.events.emit("group_item_invalid", slug=self.page_slug(tool, use_case, industry), group=group)
+        return results
+
+    def _section_requests(
+        self, tool: str, use_case: str, industry: str, keys: Optional[Iterable[str]] = None
+    ) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """Contents and generation config per section for AI_SECTIONED mode."""
         keys_and_instructions = {
             "intro_content": (
                 f"Write a 2-3 paragraph introduction explaining how {industry} teams struggle with manual {use_case} "
@@ -339,168 +2364,1170 @@ Strictly follow these output rules:
             ),
         }
 
-        content: Dict[str, str] = {}
-        for key, instruction in keys_and_instructions.items():
-            section_prompt = (
+        if keys is not None:
+            keys_and_instructions = {key: keys_and_instructions[key] for key in keys}
+
+        config = {
+            "temperature": self.temperature,
+            "max_output_tokens": max(512, min(self.max_output_tokens, 2048)),
+            "response_mime_type": "text/plain",
+        }
+        return {
+            key: (
                 f"You are a helpful assistant. Generate only the requested HTML snippet (no markdown, no JSON).\n\n"
                 f"Context: Automating {use_case} for {industry} using {tool}.\n"
-                f"Task: {instruction}"
+                f"Task: {instruction}",
+                config,
             )
+            for key, instruction in keys_and_instructions.items()
+        }
+
+    def _generate_content_with_ai_sectioned(
+        self,
+        tool: str,
+        use_case: str,
+        industry: str,
+        refresh: bool = False,
+        keys: Optional[Iterable[str]] = None,
+    ) -> Dict[str, str]:
+        requests = self._section_requests(tool, use_case, industry, keys)
+        slug = self.page_slug(tool, use_case, industry)
+
+        def generate_section(item: Tuple[str, Tuple[str, Dict[str, Any]]]) -> Tuple[str, str]:
+            key, (section_prompt, config) = item
 
             text_value: str = ""
+            reason = "empty_response"
             for attempt in range(self.retry_count + 1):
                 try:
-                    resp = self.client.models.generate_content(
-                        model=self.model,
-                        contents=section_prompt,
-                        config=genai.types.GenerateContentConfig(
-                            temperature=self.temperature,
-                            max_output_tokens=max(512, min(self.max_output_tokens, 2048)),
-                            response_mime_type="text/plain",
-                        ),
+                    text_value = self._strip_fences(
+                        self._call_model(
+                            section_prompt,
+                            config,
+                            use_cache=not refresh and attempt == 0,
+                            slug=slug,
+                            section=key,
+                        )
                     )
-                    text_value = self._strip_fences(getattr(resp, "text", ""))
                     if text_value and isinstance(text_value, str):
                         break
-                except Exception:
+                except FatalModelError as exc:
+                    print(f"Error generating {key} section: {exc}")
+                    reason = "FatalModelError"
+                    break
+                except Exception as exc:
+                    reason = type(exc).__name__
                     if attempt < self.retry_count:
                         continue
             if not text_value:
-                text_value = self.get_fallback_content(tool, use_case, industry)[key]
-            content[key] = text_value
-
-        return content
-
-    def _is_content_too_generic(self, content: Dict[str, str], industry: str) -> bool:
-        """Check if generated content is too generic/templated"""
-        # Check for generic phrases that indicate low-quality content
-        generic_phrases = [
-            "Automating .* gives .* teams a predictable way",
-            "This guide walks through the exact playbook",
-            "Eliminate low-value tasks inside your .* workflow",
-            "Most .* builds launch in 2-3 weeks",
-            "Teams typically reclaim 10-20 hours",
-        ]
+                text_value = self._fallback_content(tool, use_case, industry, reason, section=key)[key]
+            return key, text_value
+
+        # Sections are independent, so they are requested concurrently
+        results = dict(run_bounded(generate_section, requests.items(), self.section_concurrency))
+        return {key: results[key] for key in requests}
+
+    def _is_up_to_date(self, combo: Dict[str, Dict[str, str]], prompt_version: str) -> bool:
+        slug = self.page_slug(combo["tool"]["name"], combo["use_case"]["name"], combo["industry"]["name"])
+        return self.journal.is_current(slug, self.combo_inputs(combo), prompt_version) and self.page_exists(slug)
+
+    def page_exists(self, slug: str) -> bool:
+        if self.page_store == "files":
+            return (self.output_dir / f"{slug}.json").exists()
+        return slug in self.pack
+
+    def sync_page_store(self) -> None:
+        """Bring pages held only by the other store into ``page_store``, so switching it loses nothing.
+
+        A files build first exports pack pages that pages/ lacks (or holds an
+        older copy of) and only then retires the pack; the server prefers the
+        pack, so a leftover index would keep serving stale pages. A pack or both
+        build imports page files the pack lacks (or that are newer than its index).
+        """
+        index_path = self.pack.index_path
+        index_mtime = index_path.stat().st_mtime if index_path.exists() else 0.0
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if self.page_store == "files":
+            if not index_path.exists():
+                return
+            exported = 0
+            for slug, payload in self.pack.items():
+                path = self.output_dir / f"{slug}.json"
+                if path.exists():
+                    if path.stat().st_mtime >= index_mtime:
+                        continue
+                    # Written alongside the pack (PAGE_STORE=both); keep the file's source rows
+                    current = self.load_page_payload(slug) or {}
+                    if {k: v for k, v in current.items() if k != "source"} == payload:
+                        continue
+                atomic_write_text(path, json.dumps(payload, indent=2, ensure_ascii=False))
+                exported += 1
+            self.pack.retire()
+            print(f"PAGE_STORE=files: exported {exported} pages from the page pack to pages/, then removed the pack")
+            return
+
+        imported = 0
+        for json_file in sorted(self.output_dir.glob("*.json")):
+            slug = json_file.stem
+            if slug in self.pack and json_file.stat().st_mtime <= index_mtime:
+                continue
+            try:
+                payload = json.loads(json_file.read_text(encoding="utf-8"))
+            except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+                print(f"Skipping invalid file {json_file.name}: {exc}")
+                continue
+            if not isinstance(payload, dict):
+                continue
+            self.pack.append(slug, {k: v for k, v in payload.items() if k != "source"})
+            imported += 1
+        if imported:
+            self.pack.close()
+            print(f"PAGE_STORE={self.page_store}: imported {imported} pages from pages/ into the page pack")
+
+    def iter_page_payloads(self) -> Iterator[Dict[str, Any]]:
+        """Yield stored page payloads in slug order from the configured store."""
+        if self.page_store == "files":
+            for json_file in sorted(self.output_dir.glob("*.json")):
+                try:
+                    yield json.loads(json_file.read_text(encoding="utf-8"))
+                except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+                    print(f"Skipping invalid file {json_file.name}: {exc}")
+        else:
+            yield from self.pack
+
+    def load_plan_rules(self) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Optional block/allow pairing rules from data/programmatic-seo/plan_rules.json."""
+        rules_path = self.data_root / "plan_rules.json"
+        if not rules_path.exists():
+            return None
+        return json.loads(rules_path.read_text(encoding="utf-8"))
+
+    def load_plan_weights(self) -> Dict[Tuple[str, str], float]:
+        """Optional priorities from data/programmatic-seo/weights.csv (columns: kind,name,weight)."""
+        weights_path = self.data_root / "weights.csv"
+        weights: Dict[Tuple[str, str], float] = {}
+        if not weights_path.exists():
+            return weights
+        with weights_path.open(encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                kind = (row.get("kind") or "").strip()
+                if kind not in COMBO_KINDS:
+                    raise ValueError(f"weights.csv: unknown kind {kind!r}")
+                weights[(kind, (row.get("name") or "").strip())] = float(row.get("weight") or 1)
+        return weights
+
+    def build_planner(self, order: Optional[str] = None, changed_only: bool = False) -> CombinationPlanner:
+        datasets = self.load_data_files()
+        changed = None
+        if changed_only:
+            diff = self.source_diff()
+            if diff is None:
+                print("No source snapshot from a previous build; planning every combination")
+            else:
+                changed = {kind: set(entry["added"]) | set(entry["changed"]) for kind, entry in diff.items()}
+                summary = ", ".join(
+                    f"{kind} +{len(entry['added'])} ~{len(entry['changed'])} -{len(entry['removed'])}"
+                    for kind, entry in diff.items()
+                )
+                print(f"Source changes since last build: {summary}")
+                removed = sum(len(entry["removed"]) for entry in diff.values())
+                if removed:
+                    print(f"  {removed} removed rows: their existing pages are left in place")
+        budgeted = bool(self.budget_tokens or self.budget_usd)
+        return CombinationPlanner(
+            datasets,
+            # A budget spends on the highest-weighted combinations first
+            order=order or self.plan_order or ("priority" if budgeted else "stratified"),
+            rules=self.load_plan_rules(),
+            weights=self.load_plan_weights(),
+            changed=changed,
+            group_size=self.group_size if self.grouped else 1,
+        )
 
-        combined_text = " ".join(content.values())
+    def iter_planned_combos(
+        self,
+        incremental: bool = False,
+        limit: Optional[int] = None,
+        skipped: Optional[List[int]] = None,
+        planner: Optional[CombinationPlanner] = None,
+        truncated: Optional[List[bool]] = None,
+    ) -> Iterator[Dict[str, Dict[str, str]]]:
+        """Lazily yield the combinations a build would generate, in plan order.
+
+        With ``incremental`` combinations that are already up to date are skipped
+        (and counted in ``skipped[0]``); ``limit`` caps what remains, and
+        ``truncated[0]`` is set if it left planned combinations out.
+        """
+        combos: Iterable[Dict[str, Dict[str, str]]] = planner or self.build_planner()
+        if incremental:
+            prompt_version = self.prompt_version
+
+            def pending(source: Iterable[Dict[str, Dict[str, str]]]) -> Iterator[Dict[str, Dict[str, str]]]:
+                for combo in source:
+                    if self._is_up_to_date(combo, prompt_version):
+                        if skipped is not None:
+                            skipped[0] += 1
+                        continue
+                    yield combo
+
+            combos = pending(combos)
+        if not limit:
+            return iter(combos)
+
+        def capped(source: Iterator[Dict[str, Dict[str, str]]]) -> Iterator[Dict[str, Dict[str, str]]]:
+            yield from islice(source, limit)
+            if truncated is not None and next(source, None) is not None:
+                truncated[0] = True
+
+        return capped(iter(combos))
+
+    def plan(
+        self,
+        limit: Optional[int] = None,
+        incremental: Optional[bool] = None,
+        changed_only: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """Dry run: count the planned pages and estimate model calls, tokens and cost."""
+        if incremental is None:
+            incremental = self.incremental
+        if changed_only is None:
+            changed_only = self.changed_only
+        self.journal.load()
+        planner = self.build_planner(changed_only=changed_only)
+        skipped = [0]
+        planned = 0
+        prompt_chars = 0
+
+        def counted() -> Iterator[Dict[str, Dict[str, str]]]:
+            nonlocal planned, prompt_chars
+            for combo in self.iter_planned_combos(
+                incremental=incremental, limit=limit, skipped=skipped, planner=planner
+            ):
+                planned += 1
+                prompt_chars += sum(len(combo[kind]["name"]) for kind in COMBO_KINDS)
+                yield combo
+
+        # Grouped builds make one call per group the planned combinations actually form
+        groups = sum(1 for _ in self.group_combos(counted())) if self.grouped else None
+        if groups is None:
+            for _ in counted():
+                pass
+        calls, input_tokens, output_tokens = self.estimate_tokens(planned, prompt_chars, calls=groups)
+        cost = input_tokens / 1e6 * self.price_input_per_mtok + output_tokens / 1e6 * self.price_output_per_mtok
+
+        report = {
+            "order": planner.order,
+            "product": planner.total,
+            "changedOnly": planner.changed is not None,
+            "planned": planned,
+            "upToDate": skipped[0],
+            "modelCalls": calls,
+            "estimatedInputTokens": input_tokens,
+            "estimatedOutputTokens": output_tokens,
+            "estimatedCostUsd": round(cost, 4),
+        }
+        budget = self.make_budget()
+        if budget is not None:
+            if planned:
+                budget.page_estimate = (input_tokens / planned, output_tokens / planned)
+            report["budgetPages"] = min(planned, budget.affordable_pages())
+        print(json.dumps(report, indent=2))
+        return report
+
+    def estimate_tokens(self, pages: int, prompt_chars: int, calls: Optional[int] = None) -> Tuple[int, int, int]:
+        """Expected (model calls, input tokens, output tokens) for ``pages`` pages whose
+        tool, use case and industry names total ``prompt_chars`` characters.
+
+        ``calls`` overrides the call count, e.g. with the number of groups a
+        grouped plan forms; otherwise full groups are assumed.
+        """
+        calls_per_page = len(SECTION_NAMES) if self.ai_sectioned else 1
+        section_output = max(512, min(self.max_output_tokens, 2048))
+        output_per_call = section_output if self.ai_sectioned else self.max_output_tokens
+        if calls is None:
+            # Grouped calls share one prompt across up to GROUP_SIZE pages
+            calls = -(-pages // self.group_size) if self.grouped else pages * calls_per_page
+        # Prompt templates are ~1.2k chars per call; ~4 chars per token
+        input_tokens = (calls * 1200 + prompt_chars * calls_per_page * 6) // 4
+        output_tokens = int(pages * calls_per_page * output_per_call * self.output_token_ratio)
+        return calls, input_tokens, output_tokens
+
+    def make_budget(self) -> Optional[TokenBudget]:
+        """A TokenBudget for BUDGET_TOKENS/BUDGET_USD, or None when neither is set."""
+        if not (self.budget_tokens or self.budget_usd):
+            return None
+        # Until the first page settles, assume one page with ~60 characters of names
+        _, input_tokens, output_tokens = self.estimate_tokens(1, 60)
+        return TokenBudget(
+            max_tokens=self.budget_tokens,
+            max_usd=self.budget_usd,
+            price_input_per_mtok=self.price_input_per_mtok,
+            price_output_per_mtok=self.price_output_per_mtok,
+            page_estimate=(input_tokens, output_tokens),
+        )
 
-        # If content has multiple generic phrases, it's probably templated
-        generic_count = sum(1 for phrase in generic_phrases if re.search(phrase, combined_text, re.IGNORECASE))
-        if generic_count >= 3:
-            return True
+    def generate_all_pages(
+        self,
+        limit: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        incremental: Optional[bool] = None,
+        changed_only: Optional[bool] = None,
+    ) -> None:
+        """Generate the planned pages, then the manifest and sitemap.
+
+        Under a budget (BUDGET_TOKENS/BUDGET_USD) pages are admitted in plan
+        order only while the next one is expected to fit; the run then finishes
+        the pages in flight and writes its outputs as usual. Budgeted runs are
+        incremental by default, so rerunning resumes with the pages not yet built.
+        """
+        self.budget = self.make_budget()
+        if incremental is None:
+            incremental = self.incremental or self.budget is not None
+        if changed_only is None:
+            changed_only = self.changed_only
+        self.journal.load()
+        self.sync_page_store()
+        skipped = [0]
+        truncated = [False]
+        planner = self.build_planner(changed_only=changed_only)
+        combos = self.iter_planned_combos(
+            incremental=incremental, limit=limit, skipped=skipped, planner=planner, truncated=truncated
+        )
 
-        # Check if industry name appears in content (industry-specific content should mention it)
-        industry_mentions = combined_text.lower().count(industry.lower())
-        if industry_mentions < 3:  # Should mention industry at least 3 times
-            return True
+        workers = concurrency or self.concurrency
+        target = f"up to {limit}" if limit else "all planned"
+        print(f"Generating {target} pages (concurrency {workers}, render workers {self.render_workers})...")
+        self.events.start(
+            limit=limit,
+            concurrency=workers,
+            render_workers=self.render_workers,
+            incremental=incremental,
+            changed_only=planner.changed is not None,
+            budget_tokens=self.budget_tokens,
+            budget_usd=self.budget_usd,
+            sectioned=self.ai_sectioned,
+            model=self.model,
+            prompt=self.prompt_version,
+        )
+        self._build_pages(combos, workers, skipped, incremental, truncated)
+
+    def _build_pages(
+        self,
+        combos: Iterable[Dict[str, Dict[str, str]]],
+        workers: int,
+        skipped: List[int],
+        incremental: bool,
+        truncated: Optional[List[bool]] = None,
+    ) -> None:
+        """Run the page pipeline, then the manifest and sitemap, and close the run report.
+
+        When the whole plan was built without failed or fallback pages, the
+        source rows are snapshotted so the next ``changed_only`` run can diff
+        against them; ``truncated[0]`` (a limit cut the plan short) prevents that.
+        """
+        for path in (self.output_dir, self.html_output_dir):
+            path.mkdir(parents=True, exist_ok=True)
+        template = self.load_page_template()
+        records: List[Dict[str, Any]] = []
+        status = "failed"
+        try:
+            # Each page is written as soon as its content is ready; only the
+            # manifest and sitemap wait for the whole batch.
+            with self._timed("dedup_load"):
+                self._load_dedup_index()
 
-        return False
+            try:
+                records = self._run_pipeline(combos, template, workers)
+            finally:
+                self.journal.compact()
+                self.pack.close()
+                if self.dedup_index is not None:
+                    self.dedup_index.save(self._dedup_path)
+            if incremental:
+                print(f"Incremental build: {skipped[0]} pages up to date")
+            if self.budget is not None and self.budget.refused:
+                if truncated is not None:
+                    truncated[0] = True
+                summary = self.budget.summary()
+                self.events.emit("budget_exhausted", **summary)
+                print(
+                    f"Budget reached after {summary['pages']} pages "
+                    f"({summary['spentTokens']} tokens, ~${summary['spentUsd']:.2f}); rerun to continue"
+                )
 
-    def generate_all_pages(self, limit: Optional[int] = None) -> None:
-        datasets = self.load_data_files()
+            if self.cache.enabled:
+                self.cache.prune()
+                print(f"Response cache: {self.cache.hits} hits, {self.cache.misses} misses")
+
+            # Merge this run's records into the previous manifest instead of rescanning pages/
+            with self._timed("manifest"):
+                pages = self.generate_manifest(records)
+            with self._timed("sitemap"):
+                self.generate_sitemap(pages)
+            with self._timed("precompress"):
+                self.precompress_outputs()
+            status = "ok"
+            counts = self.events.counts
+            complete = truncated is not None and not truncated[0]
+            if complete and self._source_rows and not (counts.get("page_error") or counts.get("page_fallback")):
+                self.save_source_snapshot()
+        finally:
+            self.run_report = self.finish_run(status, written=len(records), skipped=skipped[0])
+            self.budget = None
+
+    def make_batch_backend(self) -> Any:
+        if self.batch_backend_name == "local":
+            return LocalBatchBackend(self.client, self.batch_dir / "local-jobs", concurrency=self.concurrency)
+        if self.batch_backend_name == "genai":
+            return GenAIBatchBackend(self.client)
+        raise ValueError(f"BATCH_BACKEND must be genai or local, not {self.batch_backend_name!r}")
+
+    @property
+    def _batch_state_path(self) -> Path:
+        return self.batch_dir / "state.json"
+
+    def _model_requests(self, combo: Dict[str, Dict[str, str]]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Every model request the synchronous path would make for ``combo``, first attempt."""
+        tool, use_case, industry = (combo[kind]["name"] for kind in COMBO_KINDS)
+        if self.ai_sectioned:
+            return list(self._section_requests(tool, use_case, industry).values())
+        return [self._page_request(tool, use_case, industry)]
 
-        template: Optional[Template] = None
-        if self.template_path.exists():
-            template = Template(self.template_path.read_text(encoding="utf-8"))
+    def _batch_requests(self, combos: List[Dict[str, Dict[str, str]]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if not self.grouped:
+            for combo in combos:
+                yield from self._model_requests(combo)
+            return
+        for group in self.group_combos(combos):
+            if len(group) == 1:
+                yield from self._model_requests(group[0])
+                continue
+            tool, use_case = group[0]["tool"]["name"], group[0]["use_case"]["name"]
+            yield self._group_request(tool, use_case, [combo["industry"]["name"] for combo in group])
+
+    def _write_batch_requests(self, combos: List[Dict[str, Dict[str, str]]], path: Path) -> int:
+        """Write the uncached requests for ``combos`` as Batch API JSONL; returns the count.
+
+        Each line is keyed by its response-cache key, so results drop straight
+        into the cache and the normal page path picks them up.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        seen: Set[str] = set()
+        with path.open("w", encoding="utf-8") as handle:
+            for contents, config in self._batch_requests(combos):
+                key = self.cache.key(self.model, contents, config)
+                if key in seen or self.cache.get(key):
+                    continue
+                seen.add(key)
+                handle.write(json.dumps(batch_request_line(key, contents, config), ensure_ascii=False) + "\n")
+        return len(seen)
+
+    def _wait_for_batch(self, backend: Any, job: str) -> str:
+        deadline = time.monotonic() + self.batch_max_wait_seconds
+        while True:
+            state = backend.poll(job)
+            self.events.emit("batch_poll", job=job, state=state)
+            if state in BATCH_TERMINAL_STATES:
+                return state
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Batch job {job} is still {state}; rerun with --batch to keep polling")
+            time.sleep(self.batch_poll_seconds)
+
+    def _ingest_batch_results(self, backend: Any, job: str) -> Dict[str, int]:
+        counts = {"ok": 0, "failed": 0}
+        for result in backend.results(job):
+            text = batch_result_text(result)
+            if result.get("error") or not text:
+                counts["failed"] += 1
+                self.events.emit("batch_item_error", key=result.get("key"), error=result.get("error"))
+                continue
+            self.events.add_tokens((result.get("response") or {}).get("usageMetadata") or {})
+            self.cache.set(result["key"], text)
+            counts["ok"] += 1
+        return counts
+
+    def generate_batch(
+        self,
+        limit: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        incremental: Optional[bool] = None,
+        changed_only: Optional[bool] = None,
+    ) -> None:
+        """Generate pages through a batch job instead of one synchronous call per request.
+
+        The planned combinations' first-attempt prompts are written to a JSONL
+        job file (requests already in the response cache are left out),
+        submitted, and polled until done. Results are stored in the response
+        cache under the same keys the synchronous path uses, then pages are
+        built through the normal pipeline in offline mode: validation, the
+        quality gate and per-item fallback behave as usual, but a request the
+        batch didn't answer uses fallback copy rather than a live call (unless
+        BATCH_SYNC_FALLBACK is set). The submitted job is remembered in
+        BATCH_DIR/state.json, so an interrupted run resumes polling the same job.
+        A budget can't be enforced per reply once a job is submitted, so it caps
+        the pages planned into the job at the estimated cost per page instead.
+        """
+        if not self.client:
+            raise ValueError("Batch mode needs GEMINI_API_KEY (or an injected client)")
+        if not self.cache.enabled:
+            raise ValueError("Batch mode stores results in the response cache; unset NO_CACHE")
+        budget = self.make_budget()
+        if incremental is None:
+            incremental = self.incremental or budget is not None
+        if changed_only is None:
+            changed_only = self.changed_only
+        backend = self.batch_backend or self.make_batch_backend()
+        workers = concurrency or self.concurrency
+        skipped = [0]
+        truncated = [False]
+        self.journal.load()
+        self.sync_page_store()
+
+        state: Optional[Dict[str, Any]] = None
+        if self._batch_state_path.exists():
+            state = json.loads(self._batch_state_path.read_text(encoding="utf-8"))
+            if state.get("prompt") != self.prompt_version:
+                print(f"Discarding batch job {state.get('job')}: built for prompt {state.get('prompt')}")
+                state = None
+
+        self.events.start(
+            mode="batch",
+            limit=limit,
+            concurrency=workers,
+            incremental=incremental,
+            sectioned=self.ai_sectioned,
+            model=self.model,
+            prompt=self.prompt_version,
+            resumed=state is not None,
+        )
+        try:
+            if state is None:
+                planner = self.build_planner(changed_only=changed_only)
+                if budget is not None:
+                    affordable = budget.affordable_pages()
+                    print(f"Budget covers about {affordable} pages")
+                    limit = min(limit, affordable) if limit else affordable
+                combos = []
+                if limit != 0:
+                    combos = list(
+                        self.iter_planned_combos(
+                            incremental=incremental, limit=limit, skipped=skipped, planner=planner, truncated=truncated
+                        )
+                    )
+                else:
+                    truncated[0] = True
+                display_name = f"programmatic-seo-{datetime.utcnow():%Y%m%d%H%M%S}"
+                requests_path = self.batch_dir / f"{display_name}.jsonl"
+                with self._timed("batch_prepare"):
+                    pending = self._write_batch_requests(combos, requests_path)
+                state = {"job": None, "prompt": self.prompt_version, "requests": str(requests_path), "combos": combos}
+                print(f"Batch: {len(combos)} pages need {pending} uncached requests")
+                if pending:
+                    state["job"] = backend.submit(self.model, requests_path, display_name)
+                    atomic_write_text(self._batch_state_path, json.dumps(state))
+                    self.events.emit("batch_submit", job=state["job"], requests=pending, pages=len(combos))
+                    print(f"Submitted batch job {state['job']}")
+            else:
+                combos = state["combos"]
+                print(f"Resuming batch job {state['job']} for {len(combos)} pages")
+
+            if state["job"]:
+                with self._timed("batch_wait"):
+                    final_state = self._wait_for_batch(backend, state["job"])
+                if final_state != BATCH_SUCCEEDED:
+                    self._batch_state_path.unlink(missing_ok=True)
+                    raise RuntimeError(f"Batch job {state['job']} ended in {final_state}")
+                with self._timed("batch_ingest"):
+                    counts = self._ingest_batch_results(backend, state["job"])
+                print(f"Batch results: {counts['ok']} ok, {counts['failed']} failed")
+        except BaseException:
+            self.run_report = self.finish_run("failed", written=0, skipped=skipped[0])
+            raise
+
+        self.offline = not self.batch_sync_fallback
+        try:
+            self._build_pages(combos, workers, skipped, incremental, truncated)
+        finally:
+            self.offline = False
+        self._batch_state_path.unlink(missing_ok=True)
+        Path(state["requests"]).unlink(missing_ok=True)
+
+    def finish_run(self, status: str, written: int, skipped: int = 0) -> Dict[str, Any]:
+        """Write the end-of-run report and print its headline numbers."""
+        counts = self.events.counts
+        fallback_pages = counts.get("page_fallback", 0)
+        fallback_rate = fallback_pages / written if written else 0.0
+        tokens = self.events.tokens
+        cost = tokens["prompt"] / 1e6 * self.price_input_per_mtok + tokens["output"] / 1e6 * self.price_output_per_mtok
+
+        alerts = []
+        if self.max_fallback_rate is not None and fallback_rate > self.max_fallback_rate:
+            alerts.append(f"fallback rate {fallback_rate:.1%} exceeds MAX_FALLBACK_RATE {self.max_fallback_rate:.1%}")
+
+        report = self.events.finish(
+            self.timings,
+            status=status,
+            pages={
+                "written": written,
+                "skipped": skipped,
+                "failed": counts.get("page_error", 0),
+                "fallback": fallback_pages,
+                "fallbackRate": round(fallback_rate, 4),
+                "nearDuplicates": counts.get("near_duplicate", 0),
+            },
+            model={
+                "calls": counts.get("model_call", 0),
+                "cacheHits": counts.get("cache_hit", 0),
+                "retries": counts.get("model_retry", 0),
+                "errors": counts.get("model_error", 0),
+                "invalidOutputs": counts.get("invalid_output", 0),
+                "qualityRejections": counts.get("quality_reject", 0),
+                "fallbacks": counts.get("fallback", 0),
+                "estimatedCostUsd": round(cost, 4),
+            },
+            budget=self.budget.summary() if self.budget is not None else None,
+            alerts=alerts,
+        )
+        print(
+            f"Run report: {written} pages, {fallback_pages} fallback ({fallback_rate:.1%}), "
+            f"{report['model']['calls']} model calls, {tokens['prompt']} in / {tokens['output']} out tokens "
+            f"(~${cost:.2f}) -> {self.events.report_path}"
+        )
+        for alert in alerts:
+            print(f"  ⚠️  {alert}")
+        return report
+
+    def _precompress_formats(self, setting: Optional[str] = None) -> Tuple[str, ...]:
+        setting = self.precompress if setting is None else setting
+        if setting in {"", "0", "off", "false", "no"}:
+            return ()
+        if setting in {"1", "auto", "true", "yes"}:
+            return ("gzip", "br") if _brotli() is not None else ("gzip",)
+        formats = tuple(fmt.strip() for fmt in setting.split(",") if fmt.strip())
+        unknown = set(formats) - set(PRECOMPRESS_SUFFIXES)
+        if unknown:
+            raise ValueError(f"PRECOMPRESS formats must be gzip and/or br, not {sorted(unknown)}")
+        if "br" in formats and _brotli() is None:
+            print("  ⚠️  PRECOMPRESS asks for br but the brotli package is not installed; skipping .br")
+            formats = tuple(fmt for fmt in formats if fmt != "br")
+        return formats
+
+    @property
+    def _precompress_state_path(self) -> Path:
+        return self.data_root / "build" / "precompress.json"
+
+    def _precompress_targets(self) -> Iterator[Path]:
+        if self.html_output_dir.exists():
+            yield from self.html_output_dir.glob("*.html")
+            yield from self.html_output_dir.glob("sitemap*.xml")
+        manifest_path = self.data_root / "index.json"
+        if manifest_path.exists():
+            yield manifest_path
+
+    def precompress_outputs(self, formats: Optional[Tuple[str, ...]] = None) -> Dict[str, int]:
+        """Write .gz/.br siblings for the HTML pages, sitemaps and index.json.
+
+        Siblings are rebuilt only when the source's content hash changes; a
+        size/mtime match against build/precompress.json skips even the hashing.
+        Files are compressed on PRECOMPRESS_WORKERS threads (zlib and brotli
+        release the GIL). Siblings of deleted sources, or of formats no longer
+        enabled, are removed.
+        """
+        formats = self._precompress_formats() if formats is None else formats
+        counts = {"compressed": 0, "unchanged": 0, "removed": 0}
+        state_path = self._precompress_state_path
+        try:
+            state = json.loads(state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            state = {}
+        previous: Dict[str, Dict[str, Any]] = state.get("files", {})
+        previous_formats = tuple(state.get("formats", ()))
+        if not formats and not previous:
+            return counts
+
+        files: Dict[str, Dict[str, Any]] = {}
+        todo: List[Tuple[Path, str, Optional[str]]] = []
+        if formats:
+            same_formats = previous_formats == formats
+            for path in self._precompress_targets():
+                rel = path.relative_to(self.root_dir).as_posix()
+                entry = previous.get(rel) if same_formats else None
+                stat = path.stat()
+                if (
+                    entry
+                    and entry.get("size") == stat.st_size
+                    and entry.get("mtime_ns") == stat.st_mtime_ns
+                    and all(path.with_name(path.name + PRECOMPRESS_SUFFIXES[fmt]).exists() for fmt in formats)
+                ):
+                    files[rel] = entry
+                    counts["unchanged"] += 1
+                    continue
+                todo.append((path, rel, (previous.get(rel) or {}).get("hash")))
+
+        def compress(item: Tuple[Path, str, Optional[str]]) -> Tuple[str, Dict[str, Any], bool]:
+            path, rel, previous_hash = item
+            digest, written = precompress_file(path, formats, previous_hash)
+            stat = path.stat()
+            return rel, {"hash": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}, written
+
+        for rel, entry, written in run_bounded(compress, todo, self.precompress_workers):
+            files[rel] = entry
+            counts["compressed" if written else "unchanged"] += 1
+
+        # Drop siblings whose source is gone or whose format was switched off
+        for rel in previous:
+            stale = previous_formats if rel not in files else tuple(f for f in previous_formats if f not in formats)
+            for fmt in stale:
+                sibling = self.root_dir / (rel + PRECOMPRESS_SUFFIXES[fmt])
+                if sibling.exists():
+                    sibling.unlink()
+                    counts["removed"] += 1
+
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(state_path, json.dumps({"formats": list(formats), "files": files}, separators=(",", ":")))
+        if formats:
+            print(
+                f"Precompressed ({', '.join(formats)}): {counts['compressed']} rebuilt, "
+                f"{counts['unchanged']} unchanged, {counts['removed']} stale siblings removed"
+            )
+        return counts
+
+    def _template_spec(self) -> Tuple[Path, str, Optional[Path]]:
+        return (self.templates_dir, self.template_path.name, self.cache.directory / "jinja")
 
-        combos: List[Dict[str, Dict[str, str]]] = []
-        for tool in datasets["tools"]:
-            for use_case in datasets["use_cases"]:
-                for industry in datasets["industries"]:
-                    combos.append({"tool": tool, "use_case": use_case, "industry": industry})
+    def load_page_template(self) -> Optional[Template]:
+        if not self.template_path.exists():
+            return None
+        return load_template(*self._template_spec())
+
+    def render_all_pages(self, workers: Optional[int] = None) -> Dict[str, int]:
+        """Re-render every stored page's HTML from its JSON without calling the model.
+
+        Payloads are streamed from the page store and the template is compiled once
+        (per process) through a bytecode-cached Environment. Only HTML files whose
+        rendered output differs are rewritten. Uses RENDER_WORKERS processes when
+        set, otherwise renders inline.
+        """
+        template = self.load_page_template()
+        if template is None:
+            raise FileNotFoundError(f"Missing template: {self.template_path}")
+
+        workers = self.render_workers if workers is None else workers
+        counts = {"written": 0, "unchanged": 0, "failed": 0}
+        self.html_output_dir.mkdir(parents=True, exist_ok=True)
+        payloads = self.iter_page_payloads()
+        with self._timed("rerender"):
+            if workers > 0:
+                from concurrent.futures import ProcessPoolExecutor
+
+                with ProcessPoolExecutor(
+                    max_workers=workers, initializer=_init_render_worker, initargs=(self._template_spec(),)
+                ) as pool:
+                    results = run_bounded(
+                        lambda payload: pool.submit(rerender_page, payload, self.html_output_dir).result(),
+                        payloads,
+                        workers * 2,
+                    )
+                    for result in results:
+                        counts[{True: "written", False: "unchanged", None: "failed"}[result]] += 1
+            else:
+                for payload in payloads:
+                    result = rerender_page(payload, self.html_output_dir, template)
+                    counts[{True: "written", False: "unchanged", None: "failed"}[result]] += 1
+
+        print(
+            f"Re-rendered {sum(counts.values())} pages: {counts['written']} written, "
+            f"{counts['unchanged']} unchanged, {counts['failed']} failed"
+        )
+        return counts
+
+    def _run_pipeline(
+        self,
+        combos: Iterable[Dict[str, Dict[str, str]]],
+        template: Optional[Template],
+        workers: int,
+    ) -> List[Dict[str, Any]]:
+        """Run producer -> render -> writer stages over ``combos``.
+
+        The producer stage fetches model content on ``workers`` threads. Rendering
+        (FAQ extraction, text stripping, JSON serialisation, Jinja) runs on a pool
+        of RENDER_WORKERS processes, or inline when that is 0. A single writer
+        thread persists rendered pages in batches of WRITE_BATCH_SIZE, so disk
+        I/O never blocks model calls.
+        """
+        records: List[Dict[str, Any]] = []
+        write_queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=self.write_batch_size * 4)
+
+        def writer() -> None:
+            done = False
+            while not done:
+                batch = [write_queue.get()]
+                while len(batch) < self.write_batch_size:
+                    try:
+                        batch.append(write_queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if None in batch:
+                    done = True
+                    batch = [item for item in batch if item is not None]
+                try:
+                    records.extend(self.write_pages(batch))
+                except Exception as exc:
+                    print(f"Failed to write {len(batch)} pages: {exc}")
+                    for rendered in batch:
+                        self.events.emit("page_error", slug=rendered["slug"], stage="write", error=str(exc))
+
+        writer_thread = threading.Thread(target=writer, name="page-writer", daemon=True)
+        writer_thread.start()
+
+        render_pool = None
+        if self.render_workers > 0:
+            from concurrent.futures import ProcessPoolExecutor
+
+            render_pool = ProcessPoolExecutor(
+                max_workers=self.render_workers,
+                initializer=_init_render_worker,
+                initargs=(self._template_spec() if template is not None else None,),
+            )
 
-        if limit:
-            combos = combos[:limit]
+        def forward(future: Future) -> None:
+            try:
+                write_queue.put(future.result())
+            except Exception as exc:
+                print(f"Failed to render page: {exc}")
+                self.events.emit("page_error", stage="render", error=str(exc))
+
+        try:
+            pending: Set[Future] = set()
+            if self.grouped:
+                groups = run_bounded(
+                    self._budgeted(self.produce_group), self._admitted(self.group_combos(combos)), workers
+                )
+                jobs: Iterable[Optional[Dict[str, Any]]] = (job for group in groups for job in group)
+            else:
+                jobs = run_bounded(self._budgeted(self.produce_page), self._admitted(combos), workers)
+            for job in jobs:
+                if job is None:
+                    continue
+                if render_pool is None:
+                    try:
+                        write_queue.put(render_page(job, template))
+                    except Exception as exc:
+                        print(f"Failed to render page for {job['slug']}: {exc}")
+                        self.events.emit("page_error", slug=job["slug"], stage="render", error=str(exc))
+                    continue
+                # Bound the render backlog so finished jobs don't pile up in memory
+                if len(pending) >= self.render_workers * 4:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        forward(future)
+                pending.add(render_pool.submit(render_page, job))
+            for future in pending:
+                forward(future)
+        finally:
+            if render_pool is not None:
+                render_pool.shutdown(wait=True)
+            write_queue.put(None)
+            writer_thread.join()
+        return records
+
+    def _admitted(self, units: Iterable[Any]) -> Iterator[Any]:
+        """Pass combinations (or groups) through until the budget refuses the next one."""
+        if self.budget is None:
+            yield from units
+            return
+        for unit in units:
+            if not self.budget.admit(len(unit) if isinstance(unit, list) else 1):
+                return
+            yield unit
+
+    def _budgeted(self, produce: Callable[[Any], R]) -> Callable[[Any], R]:
+        """Wrap a producer so each combination (or group) settles its budget reservation."""
+        budget = self.budget
+        if budget is None:
+            return produce
+
+        def run(unit: Any) -> R:
+            group = unit if isinstance(unit, list) else [unit]
+            names = [[combo[kind]["name"] for kind in COMBO_KINDS] for combo in group]
+            keys = [self.page_slug(*combo_names) for combo_names in names]
+            if isinstance(unit, list):
+                keys.append(self._group_key(names[0][0], names[0][1], [combo_names[2] for combo_names in names]))
+            try:
+                return produce(unit)
+            finally:
+                budget.settle(keys, len(group))
 
-        print(f"Generating {len(combos)} pages...")
+        return run
 
-        for combo in combos:
-            tool = combo["tool"]
-            use_case = combo["use_case"]
-            industry = combo["industry"]
+    def generate_page(
+        self, combo: Dict[str, Dict[str, str]], template: Optional[Template] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Generate, render and write a single page without the staged pipeline.
 
-            tool_name = tool["name"]
-            use_case_name = use_case["name"]
-            industry_name = industry["name"]
+        Returns the page's manifest entry, or None on failure.
+        """
+        job = self.produce_page(combo)
+        if job is None:
+            return None
+        try:
+            rendered = render_page(job, template)
+        except Exception as exc:
+            print(f"Failed to render page for {job['slug']}: {exc}")
+            self.events.emit("page_error", slug=job["slug"], stage="render", error=str(exc))
+            return None
+        return self.write_pages([rendered])[0]
 
-            try:
+    @staticmethod
+    def _plain_text(content: Dict[str, Any]) -> str:
+        return " ".join(_TAG_RE.sub("", text) for text in page_sections(content).values())
+
+    def _check_near_duplicate(
+        self, slug: str, content: Dict[str, str], tool: str, use_case: str, industry: str
+    ) -> Tuple[Dict[str, str], Optional[Dict[str, Any]]]:
+        """Compare a page with the catalog; regenerate it once if DEDUP_ACTION=regenerate.
+
+        Returns the (possibly regenerated) content and the closest match, if any.
+        """
+        index = self.dedup_index
+        signature = index.signature(self._plain_text(content))
+        regenerated = False
+        if self.dedup_action == "regenerate" and index.query(signature, exclude=slug):
+            print(f"  ⚠️  {slug} is a near-duplicate; regenerating")
+            content = self.generate_content_with_ai(tool, use_case, industry, refresh=True)
+            signature = index.signature(self._plain_text(content))
+            regenerated = True
+
+        matches = index.add(slug, signature)
+        if not matches:
+            return content, None
+        other, similarity = matches[0]
+        print(f"  ⚠️  {slug} is {similarity:.0%} similar to {other}")
+        self.events.emit(
+            "near_duplicate", slug=slug, of=other, similarity=round(similarity, 3), regenerated=regenerated
+        )
+        return content, {"of": other, "similarity": round(similarity, 3)}
+
+    def _load_dedup_index(self) -> None:
+        """Load persisted signatures and hash any stored page that lacks one."""
+        self.dedup_index = None if self.dedup_action == "off" else self._build_dedup_index()
+
+    def _build_dedup_index(self) -> NearDuplicateIndex:
+        index = NearDuplicateIndex(threshold=self.dedup_threshold).load(self._dedup_path)
+        for payload in self._payloads_missing_from(index.signatures):
+            sections = payload.get("sections", {})
+            text = " ".join(self.strip_html(sections.get(name, "")) for name in SECTION_NAMES)
+            index.add(payload["slug"], index.signature(text))
+        return index
+
+    def _payloads_missing_from(self, known: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        manifest = self._read_manifest()
+        if manifest is None:
+            yield from (payload for payload in self.iter_page_payloads() if payload.get("slug") not in known)
+            return
+        for entry in manifest:
+            slug = entry.get("slug")
+            if not slug or slug in known:
+                continue
+            payload = self.load_page_payload(slug)
+            if payload is not None:
+                yield payload
+
+    def load_page_payload(self, slug: str) -> Optional[Dict[str, Any]]:
+        if self.page_store != "files":
+            return self.pack.get(slug)
+        try:
+            return json.loads((self.output_dir / f"{slug}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    @property
+    def _dedup_path(self) -> Path:
+        return self.cache.directory / "minhash-signatures.jsonl"
+
+    def find_near_duplicates(self) -> List[Dict[str, Any]]:
+        """Scan the stored catalog and return every near-duplicate pair found via LSH."""
+        index = self._build_dedup_index()
+        index.save(self._dedup_path)
+        pairs = []
+        for slug in sorted(index.signatures):
+            for other, similarity in index.query(index.signatures[slug], exclude=slug):
+                if slug < other:
+                    pairs.append({"slug": slug, "of": other, "similarity": round(similarity, 3)})
+        return pairs
+
+    def produce_group(self, group: List[Dict[str, Dict[str, str]]]) -> List[Optional[Dict[str, Any]]]:
+        """Producer stage for GROUP_SIZE > 1: one model call for a group of industries.
+
+        Pages whose item failed validation are regenerated individually.
+        """
+        started = time.perf_counter()
+        tool_name = group[0]["tool"]["name"]
+        use_case_name = group[0]["use_case"]["name"]
+        industries = [combo["industry"]["name"] for combo in group]
+        if len(group) > 1 and self.client:
+            contents = self.generate_group_content(tool_name, use_case_name, industries)
+        else:
+            contents = {}
+        return [
+            self.produce_page(combo, content=contents.get(combo["industry"]["name"]), started=started)
+            for combo in group
+        ]
+
+    def produce_page(
+        self,
+        combo: Dict[str, Dict[str, str]],
+        content: Optional[Dict[str, str]] = None,
+        started: Optional[float] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Producer stage: fetch model content for one combination.
+
+        ``content`` skips generation (grouped mode). Returns a picklable job for
+        ``render_page``, or None on failure.
+        """
+        if started is None:
+            started = time.perf_counter()
+        tool_name = combo["tool"]["name"]
+        use_case_name = combo["use_case"]["name"]
+        industry_name = combo["industry"]["name"]
+        try:
+            if content is None:
                 content = self.generate_content_with_ai(tool_name, use_case_name, industry_name)
-                # Derive structured FAQ items from HTML for JSON-LD
-                try:
-                    faq_html = content.get("faq_content", "") or ""
-                    pairs = re.findall(r"<h4[^>]*>(.*?)</h4>\s*<p[^>]*>(.*?)</p>", faq_html, flags=re.S | re.I)
-                    faq_items = []
-                    for q, a in pairs:
-                        q_clean = self.strip_html(q)
-                        a_clean = self.strip_html(a)
-                        faq_items.append({"q": q_clean.strip(), "a": a_clean.strip()})
-                    content["faq_items"] = faq_items
-                except Exception:
-                    content["faq_items"] = []
-
-                slug = "-".join(
-                    (slugify(tool_name), slugify(use_case_name), slugify(industry_name))
+            slug = self.page_slug(tool_name, use_case_name, industry_name)
+            near_duplicate = None
+            if self.dedup_index is not None:
+                content, near_duplicate = self._check_near_duplicate(
+                    slug, content, tool_name, use_case_name, industry_name
                 )
-                title = f"{tool_name} for {use_case_name.title()} in {industry_name.title()}"
-                meta_description = (
-                    f"Learn how {tool_name} automates {use_case_name} for {industry_name} teams with a complete workflow."
-                )
-                date_published = datetime.utcnow().isoformat()
-                read_time = self.estimate_read_time(content.values())
-                intro_plain = self.strip_html(content.get("intro_content", ""))
-                excerpt = intro_plain.split(". ")[0].strip() if intro_plain else ""
+            date_published = datetime.utcnow().isoformat()
+
+            # dateModified only moves when the page copy itself changes, so sitemap
+            # lastmod values don't churn on rebuilds that reproduce the same content
+            sections_hash = content_hash(page_sections(content))
+            previous = self.journal.entries.get(slug) or {}
+            if previous.get("outputs", {}).get("sections") == sections_hash:
+                date_modified = previous.get("summary", {}).get("dateModified") or date_published
+            else:
+                date_modified = date_published
+
+            return {
+                "slug": slug,
+                "combo": combo,
+                "content": content,
+                "date_published": date_published,
+                "date_modified": date_modified,
+                "started": started,
+                "journal": {
+                    "inputs": self.combo_inputs(combo),
+                    "prompt": self.prompt_version,
+                    # Pages built from fallback copy are retried on the next incremental run
+                    "fallback": self._uses_fallback(content, tool_name, use_case_name, industry_name),
+                    "sections": sections_hash,
+                    "near_duplicate": near_duplicate,
+                },
+            }
+        except Exception as exc:
+            print(f"Failed to create page for {tool_name} / {use_case_name} / {industry_name}: {exc}")
+            self.events.emit(
+                "page_error",
+                slug=self.page_slug(tool_name, use_case_name, industry_name),
+                stage="produce",
+                error=str(exc),
+            )
+            return None
 
-                page_payload: Dict[str, Any] = {
+    def write_pages(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Writer stage: persist a batch of rendered pages and journal them.
+
+        Files are replaced atomically, so readers never see a half-written page.
+        Returns the manifest entries of the written pages.
+        """
+        records: List[Dict[str, Any]] = []
+        for rendered in batch:
+            slug = rendered["slug"]
+            page_timings = dict(rendered["timings"])
+
+            started = time.perf_counter()
+            if self.page_store in {"files", "both"}:
+                atomic_write_text(self.output_dir / f"{slug}.json", rendered["json_text"])
+            if self.page_store in {"pack", "both"}:
+                # Source rows are already tracked by hash in the build journal
+                payload = {k: v for k, v in rendered["payload"].items() if k != "source"}
+                self.pack.append(slug, payload)
+            page_timings["json_write"] = time.perf_counter() - started
+
+            if rendered["html"] is not None:
+                started = time.perf_counter()
+                atomic_write_text(self.html_output_dir / f"{slug}.html", rendered["html"])
+                page_timings["html_write"] = time.perf_counter() - started
+
+            with self._timings_lock:
+                for stage, seconds in page_timings.items():
+                    self.timings.setdefault(stage, []).append(seconds)
+
+            summary = self.manifest_entry(rendered["payload"])
+            journal = rendered["journal"]
+            self.journal.record(
+                {
                     "slug": slug,
-                    "title": title,
-                    "metaDescription": meta_description,
-                    "tool": tool_name,
-                    "useCase": use_case_name,
-                    "industry": industry_name,
-                    "datePublished": date_published,
-                    "readTime": read_time,
-                    "excerpt": excerpt,
-                    "sections": {
-                        "intro": content.get("intro_content", ""),
-                        "benefits": content.get("benefits_content", ""),
-                        "workflow": content.get("workflow_content", ""),
-                        "steps": content.get("steps_content", ""),
-                        "results": content.get("results_content", ""),
-                        "faq": content.get("faq_content", ""),
-                    },
-                    "source": {
-                        "tool": tool,
-                        "use_case": use_case,
-                        "industry": industry,
+                    "summary": summary,
+                    "inputs": journal["inputs"],
+                    "prompt": journal["prompt"],
+                    "fallback": journal["fallback"],
+                    "near_duplicate": journal.get("near_duplicate"),
+                    "outputs": {
+                        "sections": journal["sections"],
+                        "json": content_hash(rendered["json_text"]),
+                        "html": content_hash(rendered["html"]) if rendered["html"] is not None else None,
                     },
+                    "updated": datetime.utcnow().isoformat(),
                 }
+            )
+            page_seconds = time.perf_counter() - rendered["started"]
+            with self._timings_lock:
+                self.timings.setdefault("page", []).append(page_seconds)
+            if journal["fallback"]:
+                self.events.emit("page_fallback", slug=slug)
+            self.events.emit(
+                "page",
+                slug=slug,
+                seconds=round(page_seconds, 3),
+                fallback=journal["fallback"],
+                near_duplicate=bool(journal.get("near_duplicate")),
+                timings={stage: round(value, 4) for stage, value in page_timings.items()},
+            )
+            print(f"Generated page for {slug}")
+            records.append(summary)
+        return records
 
-                json_path = self.output_dir / f"{slug}.json"
-                json_path.write_text(json.dumps(page_payload, indent=2, ensure_ascii=False), encoding="utf-8")
-
-                if template is not None:
-                    html_content = template.render(
-                        title=title,
-                        meta_description=meta_description,
-                        slug=slug,
-                        tool=tool_name,
-                        use_case=use_case_name,
-                        industry=industry_name,
-                        date_published=date_published,
-                        **content,
-                    )
-                    html_path = self.html_output_dir / f"{slug}.html"
-                    html_path.write_text(html_content, encoding="utf-8")
-
-                print(f"Generated page for {slug}")
-            except Exception as exc:
-                print(f"Failed to create page for {tool_name} / {use_case_name} / {industry_name}: {exc}")
-
-        self.generate_manifest()
-        self.generate_sitemap()
+    @staticmethod
+    def manifest_entry(payload: Dict[str, Any], default_slug: str = "") -> Dict[str, Any]:
+        return {
+            "slug": payload.get("slug", default_slug),
+            "title": payload.get("title", ""),
+            "metaDescription": payload.get("metaDescription", ""),
+            "tool": payload.get("tool"),
+            "useCase": payload.get("useCase"),
+            "industry": payload.get("industry"),
+            "excerpt": payload.get("excerpt", ""),
+            "readTime": payload.get("readTime", 3),
+            "datePublished": payload.get("datePublished"),
+            "dateModified": payload.get("dateModified") or payload.get("datePublished"),
+        }
 
-    def generate_manifest(self) -> None:
+    def _read_manifest(self) -> Optional[List[Dict[str, Any]]]:
         manifest_path = self.data_root / "index.json"
+        if not manifest_path.exists():
+            return None
+        try:
+            return json.loads(manifest_path.read_text(encoding="utf-8")).get("pages", [])
+        except (json.JSONDecodeError, UnicodeDecodeError, AttributeError) as exc:
+            print(f"Ignoring unreadable manifest: {exc}")
+            return None
+
+    def _scan_manifest_entries(self) -> List[Dict[str, Any]]:
+        if self.page_store != "files":
+            return [self.manifest_entry(payload) for payload in self.pack]
         pages: List[Dict[str, Any]] = []
         for json_file in sorted(self.output_dir.glob("*.json")):
             try:
@@ -512,58 +3539,291 @@ Strictly follow these output rules:
                     json_file.write_text(content, encoding="utf-8")
 
                 payload = json.loads(content)
-                pages.append(
-                    {
-                        "slug": payload.get("slug", json_file.stem),
-                        "title": payload.get("title", ""),
-                        "metaDescription": payload.get("metaDescription", ""),
-                        "tool": payload.get("tool"),
-                        "useCase": payload.get("useCase"),
-                        "industry": payload.get("industry"),
-                        "excerpt": payload.get("excerpt", ""),
-                        "readTime": payload.get("readTime", 3),
-                        "datePublished": payload.get("datePublished"),
-                    }
-                )
+                pages.append(self.manifest_entry(payload, json_file.stem))
             except (json.JSONDecodeError, UnicodeDecodeError) as exc:
                 print(f"Skipping invalid file {json_file.name}: {exc}")
+        return pages
 
-        manifest_path.write_text(json.dumps({"pages": pages}, indent=2, ensure_ascii=False), encoding="utf-8")
+    def generate_manifest(self, records: Optional[Iterable[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Write index.json and return its page entries.
+
+        With ``records`` (entries produced during a build) the previous manifest is
+        updated in place; pages the journal knows about but the manifest lacks,
+        e.g. after an interrupted run, are added too. Without records, or when no
+        manifest exists yet, every page JSON file is scanned.
+        """
+        manifest_path = self.data_root / "index.json"
+        self.data_root.mkdir(parents=True, exist_ok=True)
+        previous = self._read_manifest() if records is not None else None
+        if previous is None:
+            pages = self._scan_manifest_entries()
+        else:
+            by_slug = {entry.get("slug"): entry for entry in previous}
+            for slug, journal_entry in self.journal.entries.items():
+                if slug not in by_slug and journal_entry.get("summary"):
+                    by_slug[slug] = journal_entry["summary"]
+            for record in records:
+                by_slug[record["slug"]] = record
+            pages = [by_slug[slug] for slug in sorted(by_slug)]
+
+        manifest_text = json.dumps({"pages": pages}, indent=2, ensure_ascii=False)
+        atomic_write_text(manifest_path, manifest_text)
         print("Manifest written to", manifest_path)
 
-    def generate_sitemap(self) -> None:
-        sitemap_path = self.html_output_dir / "sitemap.xml"
-        urls = []
-        for json_file in sorted(self.output_dir.glob("*.json")):
-            slug = json_file.stem
-            url_block = [
-                "    <url>",
-                f"        <loc>https://ayothedoc.com/automation/{slug}</loc>",
-                f"        <lastmod>{datetime.utcnow().strftime('%Y-%m-%d')}</lastmod>",
-                "        <changefreq>monthly</changefreq>",
-                "        <priority>0.7</priority>",
-                "    </url>",
-            ]
-            urls.append("\n".join(url_block))
-
-        sitemap_xml = (
+        # Facet positions index into this exact manifest; the fingerprint lets the
+        # server detect a facets.json from a different build and scan instead
+        facets = self.build_facets(pages)
+        facets["manifest"] = {"total": len(pages), "sha256": content_hash(manifest_text)}
+        facets_path = self.data_root / "facets.json"
+        atomic_write_text(facets_path, json.dumps(facets, ensure_ascii=False, separators=(",", ":")))
+        print("Facet index written to", facets_path)
+        return pages
+
+    @staticmethod
+    def build_facets(pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Precompute filter facets and a search index over manifest entries.
+
+        Every list holds positions into the manifest's ``pages`` array, in
+        ascending order, so the server can intersect them without touching the
+        manifest. Facet values appear in first-seen order.
+        """
+        fields = (("tools", "tool"), ("useCases", "useCase"), ("industries", "industry"))
+        facets: Dict[str, Dict[str, List[int]]] = {name: {} for name, _ in fields}
+        pairs: Dict[str, Dict[str, List[int]]] = {
+            f"{a}|{b}": {} for i, (_, a) in enumerate(fields) for _, b in fields[i + 1:]
+        }
+        search: Dict[str, List[int]] = {}
+
+        for position, page in enumerate(pages):
+            values = {field: page.get(field) for _, field in fields}
+            for name, field in fields:
+                if values[field]:
+                    facets[name].setdefault(values[field], []).append(position)
+            for pair_name, bucket in pairs.items():
+                a, b = pair_name.split("|")
+                if values[a] and values[b]:
+                    bucket.setdefault(f"{values[a]}|{values[b]}", []).append(position)
+
+            text = f"{page.get('title', '')} {page.get('excerpt', '')}".lower()
+            for token in set(SEARCH_TOKEN_RE.findall(text)):
+                if len(token) > 1 and token not in SEARCH_STOPWORDS:
+                    search.setdefault(token, []).append(position)
+
+        return {
+            "version": 1,
+            "total": len(pages),
+            **facets,
+            "pairs": pairs,
+            "counts": {name: {value: len(ids) for value, ids in facets[name].items()} for name, _ in fields},
+            "search": dict(sorted(search.items())),
+            "stopwords": sorted(SEARCH_STOPWORDS),
+        }
+
+    def _sitemap_shard_path(self, number: int) -> Path:
+        suffix = ".xml.gz" if self.sitemap_gzip else ".xml"
+        return self.html_output_dir / f"sitemap-{number}{suffix}"
+
+    def generate_sitemap(self, pages: Optional[Iterable[Dict[str, Any]]] = None) -> None:
+        """Write sharded sitemaps plus a sitemap index at public/automation/sitemap.xml.
+
+        URLs are streamed into shards of at most SITEMAP_SHARD_SIZE entries (and
+        under the 50 MB protocol limit), optionally gzipped. Each URL's lastmod is
+        the page's dateModified; each shard's lastmod is the newest of its URLs.
+        """
+        if pages is None:
+            pages = self._read_manifest()
+            if pages is None:
+                pages = self._scan_manifest_entries()
+
+        self.html_output_dir.mkdir(parents=True, exist_ok=True)
+        base_url = "https://ayothedoc.com/automation"
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        header = (
             '<?xml version="1.0" encoding="UTF-8"?>\n'
             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
-            + "\n".join(urls)
-            + "\n</urlset>"
         )
-        sitemap_path.write_text(sitemap_xml, encoding="utf-8")
-        print("Sitemap published at", sitemap_path)
+        footer = "</urlset>\n"
+
+        shards: List[Tuple[Path, str]] = []
+        handle = None
+        count = size = 0
+        shard_lastmod = ""
+        try:
+            for page in pages:
+                lastmod = str(page.get("dateModified") or page.get("datePublished") or today)[:10]
+                url_block = (
+                    "    <url>\n"
+                    f"        <loc>{xml_escape(base_url + '/' + page['slug'])}</loc>\n"
+                    f"        <lastmod>{lastmod}</lastmod>\n"
+                    "        <changefreq>monthly</changefreq>\n"
+                    "        <priority>0.7</priority>\n"
+                    "    </url>\n"
+                )
+                block_size = len(url_block.encode("utf-8"))
+                if handle is not None and (
+                    count >= self.sitemap_shard_size or size + block_size + len(footer) > SITEMAP_MAX_BYTES
+                ):
+                    handle.write(footer)
+                    handle.close()
+                    handle = None
+                    shards[-1] = (shards[-1][0], shard_lastmod)
+                if handle is None:
+                    path = self._sitemap_shard_path(len(shards) + 1)
+                    handle = (
+                        gzip.open(path, "wt", encoding="utf-8")
+                        if self.sitemap_gzip
+                        else path.open("w", encoding="utf-8")
+                    )
+                    handle.write(header)
+                    shards.append((path, ""))
+                    count, size, shard_lastmod = 0, len(header.encode("utf-8")), ""
+                handle.write(url_block)
+                count += 1
+                size += block_size
+                shard_lastmod = max(shard_lastmod, lastmod)
+            if handle is not None:
+                handle.write(footer)
+                shards[-1] = (shards[-1][0], shard_lastmod)
+        finally:
+            if handle is not None:
+                handle.close()
+
+        # Remove shards left over from a previous, larger or differently compressed build,
+        # keeping the precompressed siblings of current shards so they aren't rebuilt
+        current = {path.name for path, _ in shards}
+        current |= {name + suffix for name in current for suffix in PRECOMPRESS_SUFFIXES.values()}
+        for stale in self.html_output_dir.glob("sitemap-*.xml*"):
+            if stale.name not in current:
+                stale.unlink()
+
+        index_lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+        ]
+        for path, lastmod in shards:
+            index_lines.extend(
+                [
+                    "    <sitemap>",
+                    f"        <loc>{xml_escape(base_url + '/' + path.name)}</loc>",
+                    f"        <lastmod>{lastmod or today}</lastmod>",
+                    "    </sitemap>",
+                ]
+            )
+        index_lines.append("</sitemapindex>")
+        sitemap_path = self.html_output_dir / "sitemap.xml"
+        sitemap_path.write_text("\n".join(index_lines) + "\n", encoding="utf-8")
+        print(f"Sitemap index published at {sitemap_path} ({len(shards)} shards)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="programmatic_seo.py",
+        description="Build programmatic SEO pages. Without arguments, runs `generate --limit 10`.",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    generate = commands.add_parser("generate", help="generate pages with the model, then the manifest and sitemap")
+    generate.add_argument("--limit", type=int, default=10, help="max pages this run, 0 for all (default: 10)")
+    generate.add_argument("--concurrency", type=int, help="pages in flight (default: CONCURRENCY)")
+    generate.add_argument(
+        "--incremental", action=argparse.BooleanOptionalAction, default=None, help="skip up-to-date pages"
+    )
+    generate.add_argument("--batch", action="store_true", help="submit the prompts as one batch job")
+    generate.add_argument(
+        "--changed-only",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="only combinations touching source rows changed since the last complete build",
+    )
+
+    render = commands.add_parser("render", help="re-render HTML from stored page JSON without calling the model")
+    render.add_argument("--workers", type=int, help="render processes (default: RENDER_WORKERS)")
+
+    commands.add_parser("manifest", help="rebuild index.json and facets.json from the stored pages")
+    commands.add_parser("sitemap", help="rewrite the sitemap shards and index from index.json")
+
+    precompress = commands.add_parser("precompress", help="write .gz/.br siblings for changed output files")
+    precompress.add_argument("--formats", help="gzip, br or gzip,br (default: PRECOMPRESS, else auto)")
+
+    plan = commands.add_parser("plan", help="dry run: planned pages, model calls, tokens and cost")
+    plan.add_argument("--limit", type=int, default=0, help="max pages, 0 for all")
+    plan.add_argument("--order", choices=CombinationPlanner.ORDERS, help="plan order (default: PLAN_ORDER)")
+    plan.add_argument(
+        "--incremental", action=argparse.BooleanOptionalAction, default=None, help="skip up-to-date pages"
+    )
+    plan.add_argument(
+        "--changed-only", action=argparse.BooleanOptionalAction, default=None, help="as for generate"
+    )
+
+    for command in (generate, plan):
+        command.add_argument(
+            "--budget-tokens", type=int, help="stop admitting pages past this many tokens (BUDGET_TOKENS)"
+        )
+        command.add_argument("--budget-usd", type=float, help="stop admitting pages past this spend (BUDGET_USD)")
 
+    commands.add_parser("sources", help="validate the source CSVs and diff them against the last complete build")
+    commands.add_parser("bench", help="offline benchmark; see `bench --help`", add_help=False)
+    return parser
 
-def main(limit: Optional[int] = None) -> None:
-    generator = ProgrammaticSEOGenerator()
-    generator.create_sample_data()
-    generator.create_html_template()
-    generator.generate_all_pages(limit=limit)
 
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv[:1] == ["bench"]:
+        # The benchmark owns its arguments (and its --help)
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        from bench_programmatic_seo import main as bench_main
 
-if __name__ == "__main__":
-    main(limit=10)
+        bench_main(argv[1:])
+        return 0
+    if not argv:
+        # Bare invocation keeps its original meaning: generate ten pages
+        argv = ["generate", "--limit", "10"]
+    args = build_parser().parse_args(argv)
 
+    generator = ProgrammaticSEOGenerator()
+    if getattr(args, "budget_tokens", None) is not None:
+        generator.budget_tokens = args.budget_tokens
+    if getattr(args, "budget_usd", None) is not None:
+        generator.budget_usd = args.budget_usd
+    if args.command == "render":
+        generator.sync_page_store()
+        generator.render_all_pages(workers=args.workers)
+        generator.precompress_outputs()
+    elif args.command == "manifest":
+        generator.sync_page_store()
+        generator.generate_manifest()
+        generator.precompress_outputs()
+    elif args.command == "sitemap":
+        generator.generate_sitemap()
+        generator.precompress_outputs()
+    elif args.command == "precompress":
+        setting = args.formats or (generator.precompress if generator.precompress != "off" else "auto")
+        generator.precompress_outputs(generator._precompress_formats(setting.lower()))
+    elif args.command == "plan":
+        if args.order:
+            generator.plan_order = args.order
+        generator.plan(limit=args.limit or None, incremental=args.incremental, changed_only=args.changed_only)
+    elif args.command == "sources":
+        try:
+            diff = generator.source_diff()
+        except SourceDataError as exc:
+            print(exc)
+            return 1
+        print(json.dumps(diff, indent=2, ensure_ascii=False) if diff is not None else "No source snapshot yet")
+    else:
+        generator.create_sample_data()
+        generator.create_html_template()
+        build = generator.generate_batch if args.batch else generator.generate_all_pages
+        build(
+            limit=args.limit or None,
+            concurrency=args.concurrency,
+            incremental=args.incremental,
+            changed_only=args.changed_only,
+        )
+        if generator.run_report and generator.run_report["alerts"]:
+            return 1
+    return 0
 
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,7 @@ import fs from "fs";
 // Import routes
 import blogRouter from "./routes/blog.js";
 import leadsRouter from "./routes/leads.js";
-import automationRouter from "./routes/automation.js";
+import automationRouter, { sendPrecompressed } from "./routes/automation.js";
 
 async function startServer() {
   const app = express();
@@ -90,21 +90,33 @@ Sitemap: https://ayothedoc.com/sitemap.xml
       }
     }
 
-    // Automation playbooks
-    const autoUrls: { loc: string; priority: string; changefreq: string }[] = [];
-    const pagesDir = path.join(process.cwd(), "data", "programmatic-seo", "pages");
-    if (fs.existsSync(pagesDir)) {
-      const files = fs.readdirSync(pagesDir).filter(f => f.endsWith(".json"));
-      for (const file of files) {
-        const slug = file.replace(/\.json$/, "");
-        autoUrls.push({ loc: `/automation/${slug}`, priority: "0.7", changefreq: "monthly" });
+    // Automation playbooks, from the manifest (pages/ is empty when PAGE_STORE=pack)
+    // Each carries its own lastmod so crawlers only revisit pages whose copy changed
+    const autoUrls: { loc: string; priority: string; changefreq: string; lastmod?: string }[] = [];
+    const manifestPath = path.join(process.cwd(), "data", "programmatic-seo", "index.json");
+    if (fs.existsSync(manifestPath)) {
+      try {
+        const manifest = JSON.parse(fs.readFileSync(manifestPath, "utf8")) as {
+          pages?: { slug?: string; dateModified?: string; datePublished?: string }[];
+        };
+        for (const page of manifest.pages || []) {
+          if (!page.slug) continue;
+          const lastmod = (page.dateModified || page.datePublished || "").slice(0, 10) || undefined;
+          autoUrls.push({ loc: `/automation/${page.slug}`, priority: "0.7", changefreq: "monthly", lastmod });
+        }
+      } catch (error) {
+        console.error("Failed to read automation manifest for sitemap:", error);
       }
     }
 
-    const allUrls = [...staticPages, ...blogUrls, ...autoUrls];
+    const allUrls: { loc: string; priority: string; changefreq: string; lastmod?: string }[] = [
+      ...staticPages,
+      ...blogUrls,
+      ...autoUrls,
+    ];
     const urlEntries = allUrls.map(u => `  <url>
     <loc>${base}${u.loc}</loc>
-    <lastmod>${today}</lastmod>
+    <lastmod>${u.lastmod || today}</lastmod>
     <changefreq>${u.changefreq}</changefreq>
     <priority>${u.priority}</priority>
   </url>`).join("\n");
@@ -126,6 +138,17 @@ ${urlEntries}
   // The static files are in dist/public relative to project root
   const staticPath = path.resolve(process.cwd(), "dist", "public");
 
+  // Automation pages and sitemaps are written by scripts/programmatic_seo.py to public/automation
+  // at the repo root, which the Vite build doesn't copy into dist/public; serve them from there,
+  // preferring the precompressed .br/.gz siblings it writes with PRECOMPRESS
+  const automationPath = path.resolve(process.cwd(), "public", "automation");
+  app.get(/^\/automation\/[^/]+\.(html|xml)$/, (req, res, next) => {
+    const file = path.join(automationPath, path.basename(req.path));
+    if (sendPrecompressed(req, res, file)) return;
+    if (!fs.existsSync(file)) return next();
+    res.sendFile(file);
+  });
+
   app.use(express.static(staticPath));
 
   // Handle client-side routing - serve index.html for all non-API routes
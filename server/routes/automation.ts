@@ -1,4 +1,5 @@
 import { Router, Request, Response } from 'express'
+import crypto from 'crypto'
 import fs from 'fs'
 import path from 'path'
 import { fileURLToPath } from 'url'
@@ -50,8 +51,199 @@ function getDataDirectory(): string {
   return prodPath
 }
 
+interface PackIndex {
+  version: number
+  // Data file this index describes; compaction moves pages to a new generation's file
+  pack: string
+  generation?: number
+  size: number
+  pages: Record<string, [number, number]>
+}
+
+interface FacetIndex {
+  version: number
+  total: number
+  tools: Record<string, number[]>
+  useCases: Record<string, number[]>
+  industries: Record<string, number[]>
+  pairs: Record<string, Record<string, number[]>>
+  counts: Record<string, Record<string, number>>
+  search: Record<string, number[]>
+  stopwords: string[]
+  // Fingerprint of the index.json these positions refer to
+  manifest?: { total: number; sha256: string }
+}
+
+interface Manifest {
+  pages?: PlaybookSummary[]
+  sha256: string
+}
+
+const jsonCache = new Map<string, { mtimeMs: number; data: unknown }>()
+
+// Parse a JSON file once and reuse it until the file changes on disk
+function readJsonCached<T>(filePath: string): T | null {
+  if (!fs.existsSync(filePath)) return null
+
+  const { mtimeMs } = fs.statSync(filePath)
+  const cached = jsonCache.get(filePath)
+  if (cached && cached.mtimeMs === mtimeMs) return cached.data as T
+
+  const data = JSON.parse(fs.readFileSync(filePath, 'utf8'))
+  jsonCache.set(filePath, { mtimeMs, data })
+  return data as T
+}
+
+const manifestCache = new Map<string, { mtimeMs: number; data: Manifest }>()
+
+// Parse index.json once per change, keeping the SHA-256 of its bytes for facet checks
+function readManifestCached(filePath: string): Manifest | null {
+  if (!fs.existsSync(filePath)) return null
+
+  const { mtimeMs } = fs.statSync(filePath)
+  const cached = manifestCache.get(filePath)
+  if (cached && cached.mtimeMs === mtimeMs) return cached.data
+
+  const raw = fs.readFileSync(filePath)
+  const data: Manifest = {
+    ...JSON.parse(raw.toString('utf8')),
+    sha256: crypto.createHash('sha256').update(raw).digest('hex'),
+  }
+  manifestCache.set(filePath, { mtimeMs, data })
+  return data
+}
+
+// facets.json is only usable when it was built from the manifest being served
+function matchingFacets(dataDir: string, manifest: Manifest | null): FacetIndex | null {
+  const facets = readJsonCached<FacetIndex>(path.join(dataDir, 'facets.json'))
+  if (!facets || !manifest || !facets.manifest) return null
+  const total = manifest.pages?.length || 0
+  return facets.manifest.total === total && facets.manifest.sha256 === manifest.sha256 ? facets : null
+}
+
+const precompressed: Array<[string, string]> = [['br', '.br'], ['gzip', '.gz']]
+
+// Send the .br/.gz sibling scripts/programmatic_seo.py writes with PRECOMPRESS, if the client
+// accepts it. Siblings carry their source's mtime, so any other mtime means the sibling is stale.
+export function sendPrecompressed(req: Request, res: Response, file: string): boolean {
+  let source: fs.Stats
+  try {
+    source = fs.statSync(file)
+  } catch {
+    return false
+  }
+  const accepted = String(req.headers['accept-encoding'] || '')
+  res.setHeader('Vary', 'Accept-Encoding')
+  for (const [encoding, suffix] of precompressed) {
+    if (!accepted.includes(encoding)) continue
+    try {
+      if (fs.statSync(file + suffix).mtimeMs !== source.mtimeMs) continue
+    } catch {
+      continue
+    }
+    res.setHeader('Content-Encoding', encoding)
+    res.type(path.extname(file))
+    res.sendFile(file + suffix)
+    return true
+  }
+  return false
+}
+
+// Own-property lookup so user input like "constructor" never hits the prototype
+function own<T>(record: Record<string, T> | undefined, key: string): T | undefined {
+  return record && Object.prototype.hasOwnProperty.call(record, key) ? record[key] : undefined
+}
+
+// Look up a page in the packed store written by PAGE_STORE=pack|both
+function readPackedPage(dataDir: string, slug: string): PlaybookPage | null {
+  const packIndex = readJsonCached<PackIndex>(path.join(dataDir, 'pages.pack.idx.json'))
+  if (!packIndex) return null
+
+  const span = own(packIndex.pages, slug)
+  if (!span) return null
+
+  const [offset, length] = span
+  const buffer = Buffer.alloc(length)
+  let fd: number
+  try {
+    fd = fs.openSync(path.join(dataDir, packIndex.pack), 'r')
+  } catch {
+    // A compaction replaced the pack after this index was read; the next request sees the new pair
+    return null
+  }
+  try {
+    fs.readSync(fd, buffer, 0, length, offset)
+  } finally {
+    fs.closeSync(fd)
+  }
+  return JSON.parse(buffer.toString('utf8'))
+}
+
+// Intersect ascending position lists, smallest first
+function intersectSorted(lists: number[][]): number[] {
+  if (lists.length === 0) return []
+  const [first, ...rest] = [...lists].sort((a, b) => a.length - b.length)
+  const others = rest.map(list => new Set(list))
+  return first.filter(position => others.every(set => set.has(position)))
+}
+
+function queryParam(value: unknown): string | undefined {
+  return typeof value === 'string' && value.trim() ? value.trim() : undefined
+}
+
+// Resolve filters and a free-text query to manifest positions using facets.json
+function lookupPositions(
+  facets: FacetIndex,
+  filters: Record<string, string | undefined>,
+  q?: string,
+): number[] | null {
+  const { tool, useCase, industry } = filters
+  const lists: number[][] = []
+
+  if (tool && useCase) lists.push(own(facets.pairs['tool|useCase'], `${tool}|${useCase}`) || [])
+  else if (tool) lists.push(own(facets.tools, tool) || [])
+  else if (useCase) lists.push(own(facets.useCases, useCase) || [])
+
+  if (industry) {
+    if (useCase) lists.push(own(facets.pairs['useCase|industry'], `${useCase}|${industry}`) || [])
+    else if (tool) lists.push(own(facets.pairs['tool|industry'], `${tool}|${industry}`) || [])
+    else lists.push(own(facets.industries, industry) || [])
+  }
+
+  if (q) {
+    const stopwords = new Set(facets.stopwords || [])
+    const tokens = (q.toLowerCase().match(/[a-z0-9]+/g) || []).filter(t => t.length > 1 && !stopwords.has(t))
+    for (const token of tokens) {
+      lists.push(own(facets.search, token) || [])
+    }
+  }
+
+  // No usable constraint (e.g. a query of only stopwords) means every page
+  return lists.length ? intersectSorted(lists) : null
+}
+
+// Same filters as lookupPositions, answered by scanning the manifest (facets missing or stale)
+function scanPages(
+  pages: PlaybookSummary[],
+  filters: Record<string, string | undefined>,
+  q: string | undefined,
+  stopwords: Set<string>,
+): PlaybookSummary[] {
+  const { tool, useCase, industry } = filters
+  const tokens = (q?.toLowerCase().match(/[a-z0-9]+/g) || []).filter(t => t.length > 1 && !stopwords.has(t))
+  return pages.filter(page => {
+    if (tool && page.tool !== tool) return false
+    if (useCase && page.useCase !== useCase) return false
+    if (industry && page.industry !== industry) return false
+    if (!tokens.length) return true
+    const words = new Set(`${page.title || ''} ${page.excerpt || ''}`.toLowerCase().match(/[a-z0-9]+/g) || [])
+    return tokens.every(token => words.has(token))
+  })
+}
+
 // GET /api/automation - Get all playbook summaries
-router.get('/', async (_req: Request, res: Response) => {
+// Optional ?tool=&useCase=&industry=&q= filters are answered from facets.json
+router.get('/', async (req: Request, res: Response) => {
   try {
     const dataDir = getDataDirectory()
     const indexPath = path.join(dataDir, 'index.json')
@@ -60,8 +252,34 @@ router.get('/', async (_req: Request, res: Response) => {
       return res.json({ pages: [] })
     }
 
-    const indexData = JSON.parse(fs.readFileSync(indexPath, 'utf8'))
-    res.json(indexData)
+    const indexData = readManifestCached(indexPath)
+    const pages = indexData?.pages || []
+    const filters = {
+      tool: queryParam(req.query.tool),
+      useCase: queryParam(req.query.useCase),
+      industry: queryParam(req.query.industry),
+    }
+    const q = queryParam(req.query.q)
+
+    if (!filters.tool && !filters.useCase && !filters.industry && !q) {
+      // index.json is exactly { pages }, so its precompressed sibling is the same response
+      if (sendPrecompressed(req, res, indexPath)) return
+      return res.json({ pages })
+    }
+
+    const facets = matchingFacets(dataDir, indexData)
+    if (!facets) {
+      // Stopwords don't depend on the manifest, so a stale facets.json still supplies them
+      const stale = readJsonCached<FacetIndex>(path.join(dataDir, 'facets.json'))
+      return res.json({ pages: scanPages(pages, filters, q, new Set(stale?.stopwords || [])) })
+    }
+
+    const positions = lookupPositions(facets, filters, q)
+    if (positions === null) {
+      return res.json({ pages })
+    }
+
+    res.json({ pages: positions.map(position => pages[position]).filter(Boolean) })
   } catch (error) {
     console.error('Error fetching automation index:', error)
     res.status(500).json({ error: 'Failed to fetch automation playbooks' })
@@ -78,8 +296,18 @@ router.get('/filters', async (_req: Request, res: Response) => {
       return res.json({ tools: [], useCases: [], industries: [] })
     }
 
-    const indexData = JSON.parse(fs.readFileSync(indexPath, 'utf8'))
-    const pages: PlaybookSummary[] = indexData.pages || []
+    const indexData = readManifestCached(indexPath)
+    const facets = matchingFacets(dataDir, indexData)
+    if (facets) {
+      return res.json({
+        tools: Object.keys(facets.tools),
+        useCases: Object.keys(facets.useCases),
+        industries: Object.keys(facets.industries),
+        counts: facets.counts,
+      })
+    }
+
+    const pages: PlaybookSummary[] = indexData?.pages || []
 
     const tools = [...new Set(pages.map(p => p.tool).filter(Boolean))]
     const useCases = [...new Set(pages.map(p => p.useCase).filter(Boolean))]
@@ -97,6 +325,12 @@ router.get('/:slug', async (req: Request, res: Response) => {
   try {
     const { slug } = req.params
     const dataDir = getDataDirectory()
+
+    const packedPage = readPackedPage(dataDir, slug)
+    if (packedPage) {
+      return res.json(packedPage)
+    }
+
     const pagePath = path.join(dataDir, 'pages', `${slug}.json`)
 
     if (!fs.existsSync(pagePath)) {